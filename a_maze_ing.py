@@ -5,19 +5,50 @@ Docstring pour a_maze_ing
 
 import sys
 import os
+import json
+import random
+import select
+import shutil
+import time
+from contextlib import redirect_stdout
 import termios
 import tty
 from config_loader import get_config
-from mazegen import MazeManager, BFS
+from mazegen import (
+    MazeManager,
+    EllerGenerator,
+    MazeCache,
+    SOLVERS,
+    solve_file,
+    run_batch,
+    instrumentation,
+    serve,
+)
+
+
+# frame rate cap and target length of the generation animation
+ANIMATION_FPS = 30
+ANIMATION_SECONDS = 3
+# terminal lines kept for the menu under a maze bigger than the screen
+MENU_LINES = 16
+# escape sequences of the arrow keys
+ARROWS = {"[A": "UP", "[B": "DOWN", "[C": "RIGHT", "[D": "LEFT"}
 
 
 def get_input():
-    """Get a single character from stdin without requiring Enter"""
+    """
+    Get a single character from stdin without requiring Enter.
+    Arrow keys come as "UP", "DOWN", "LEFT" and "RIGHT".
+    """
     fd = sys.stdin.fileno()
     old_settings = termios.tcgetattr(fd)
     try:
         tty.setraw(sys.stdin.fileno())
-        ch = sys.stdin.read(1)
+        # os.read: no buffering, the rest of an escape sequence stays
+        # visible to select()
+        ch = os.read(fd, 1).decode(errors="replace")
+        if ch == "\x1b" and select.select([fd], [], [], 0.05)[0]:
+            ch = ARROWS.get(os.read(fd, 2).decode(errors="replace"), ch)
     finally:
         termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
     return ch
@@ -53,18 +84,31 @@ def print_banner():
     print("\n\n\n\n")
 
 
-def print_menu(show_path: bool, color: str):
-    """Print the interactive menu as an ASCII table"""
+def print_menu(show_path: bool, color: str, mm: MazeManager, view=None):
+    """
+    Print the interactive menu as an ASCII table
+    (view: (top, left, rows, cols) when only a window of the maze is shown)
+    """
     path_status = "ON" if show_path else "OFF"
     color_status = color
+    gen_status = f"{mm.algorithm} in {mm.generation_time:.3f}s"
+    pan = ""
+    if view is not None:
+        top, left, rows, cols = view
+        pan = (
+            f"\n  [Arrows] Move the view  [rows {top}-"
+            f"{min(mm.height, top + rows) - 1} of {mm.height}, cols {left}-"
+            f"{min(mm.width, left + cols) - 1} of {mm.width}]"
+        )
 
     menu = f"""
                     A-MAZE-ING MENU
 ----------------------------------------------------------
-  [1] Generate maze
+  [1] Generate maze  [{gen_status}]
   [2] Show / Hide shortest path  [{path_status}]
   [3] Change colors
       └─ Current: {color_status}
+  [4] Watch the next maze being generated{pan}
   [Q] Quit
 ----------------------------------------------------------
 
@@ -88,17 +132,45 @@ Press a key: """
     print(menu, end="", flush=True)
 
 
-def generate_maze(config):
-    """Generate a new maze"""
-    mm = MazeManager(config)
-    mm.generate_maze_dfs()
+def generate_maze(mm: MazeManager):
+    """Generate a new maze, next one in the SEED sequence"""
+    mm.generate()
     return mm
 
 
+def animate_maze(mm: MazeManager):
+    """
+    Generate the next maze of the SEED sequence on screen: only the
+    cells changed by each carve are redrawn, at ANIMATION_FPS frames per
+    second, in about ANIMATION_SECONDS whatever the maze size
+    """
+    clear_screen()
+    events = mm.iter_generate()
+    carves = mm.height * mm.width
+    steps = max(1, round(carves / (ANIMATION_FPS * ANIMATION_SECONDS)))
+    mm.renderer.color = mm.color
+    mm.renderer.animate(mm, events, sys.stdout, ANIMATION_FPS, steps)
+    return mm
+
+
+def stream_maze(config):
+    """Generate the maze row by row straight into OUTPUT_FILE"""
+    eller = EllerGenerator(
+        config["HEIGHT"],
+        config["WIDTH"],
+        random.Random(config["SEED"]),
+        config["PERFECT"],
+        config.get("LOOP_DENSITY", 0.35),
+    )
+    eller.save_maze_file(
+        config["OUTPUT_FILE"], config["ENTRY"], config["EXIT"]
+    )
+
+
 def calculate_path(mm: MazeManager):
     """Calculate the shortest path for the maze"""
-    bfs = BFS()
-    path = bfs.shortest_path(
+    solver = SOLVERS[mm.solver]()
+    path = solver.shortest_path(
         maze=mm.maze,
         height=mm.height,
         width=mm.width,
@@ -108,62 +180,405 @@ def calculate_path(mm: MazeManager):
     return path
 
 
-def display_maze(mm: MazeManager, path: list = [None], show_path: bool = True):
-    """Display the maze with optional path"""
+def get_cache(config):
+    """Maze cache from CACHE_DIR / CACHE_MAX_MB, None when not configured"""
+    if not config.get("CACHE_DIR"):
+        return None
+    return MazeCache(
+        config["CACHE_DIR"], config.get("CACHE_MAX_MB", 64) * 1024 * 1024
+    )
+
+
+def load_or_generate(config, cache, timings=None):
+    """
+    First maze of the config and its path: read from the cache when this
+    exact config was already generated, else generated, solved and stored.
+    timings, when given, gets the time of each step taken
+    (cache_load on a hit)
+    """
+    if timings is None:
+        timings = {}
+    mm = MazeManager(config)
+    start = time.perf_counter()
+    hit = cache.load(config) if cache else None
+    if hit is not None:
+        mm.maze = hit.grid
+        mm.rng.setstate(hit.rng_state)
+        timings["cache_load"] = time.perf_counter() - start
+        return mm, hit.path
+
+    mm.generate()
+    timings["generation"] = mm.generation_time
+    timings["make_imperfect"] = mm.imperfect_time
+
+    start = time.perf_counter()
+    path = calculate_path(mm)
+    timings["solving"] = time.perf_counter() - start
+
+    if cache:
+        start = time.perf_counter()
+        cache.store(config, mm.maze, path, mm.rng.getstate())
+        timings["cache_store"] = time.perf_counter() - start
+    return mm, path
+
+
+def display_maze(
+    mm: MazeManager,
+    path: list = [None],
+    show_path: bool = True,
+    view=None,
+):
+    """Display the maze (or its view window) with optional path"""
     if path is None:
         path = []
     if not show_path:
         path = []
-    mm.print_maze(path)
+    mm.print_maze(path, view)
+
+
+def get_view(mm: MazeManager, top: int, left: int):
+    """
+    (top, left, rows, cols) window of the maze fitting the terminal,
+    top / left clamped to the maze; None when the whole maze fits
+    """
+    size = shutil.get_terminal_size()
+    # a cell is 2 lines and 4 columns, plus the closing wall
+    rows = max(1, (size.lines - MENU_LINES - 1) // 2)
+    cols = max(1, (size.columns - 2) // 4)
+    if rows >= mm.height and cols >= mm.width:
+        return None
+    top = max(0, min(top, mm.height - rows))
+    left = max(0, min(left, mm.width - cols))
+    return top, left, rows, cols
+
+
+def pan_view(view, key: str):
+    """New (top, left) of the view after an arrow key: a quarter window"""
+    top, left, rows, cols = view
+    if key == "UP":
+        top -= max(1, rows // 4)
+    elif key == "DOWN":
+        top += max(1, rows // 4)
+    elif key == "LEFT":
+        left -= max(1, cols // 4)
+    elif key == "RIGHT":
+        left += max(1, cols // 4)
+    return top, left
+
+
+def draw_screen(mm: MazeManager, path: list, show_path: bool, view):
+    """
+    Clear the screen and draw the maze: whole under the banner, or
+    only the view window when it does not fit the terminal
+    """
+    clear_screen()
+    if view is None:
+        print_banner()
+    display_maze(mm, path, show_path, view)
+
+
+def solve_files(args):
+    """
+    solve mode: solve or verify HEX maze files, one result line each.
+    Returns the exit code: 1 if a file is invalid, unsolvable or unreadable,
+    or has no path line with --check
+    """
+    usage = (
+        "Correct usage: python3 a_maze_ing.py solve "
+        "[--solver bfs|bidirectional|astar] [--check] <maze_file>..."
+    )
+    solver = "bfs"
+    write = True
+    files = []
+    args = iter(args)
+    for arg in args:
+        if arg == "--solver":
+            solver = next(args, "")
+        elif arg == "--check":
+            write = False
+        else:
+            files.append(arg)
+    if solver not in SOLVERS or not files:
+        print(usage)
+        return 2
+
+    code = 0
+    for file in files:
+        try:
+            result = solve_file(file, SOLVERS[solver], write)
+        except (OSError, ValueError) as e:
+            print(f"{file}: error: {e}")
+            code = 1
+            continue
+        line = f"{file}: {result.status}"
+        if result.length is not None:
+            line += f" ({result.length} moves)"
+        if result.message:
+            line += f": {result.message}"
+        print(line)
+        if result.status in ("missing", "invalid", "unsolvable"):
+            code = 1
+    return code
+
+
+def batch_files(args):
+    """
+    batch mode: generate, solve and write the maze of every seed of a
+    range on a process pool. Returns the exit code
+    """
+    usage = (
+        "Correct usage: python3 a_maze_ing.py batch <config_file> "
+        "<first_seed>:<end_seed> [--workers N] [--chunk N] [--archive FILE]"
+    )
+    options = {"--workers": None, "--chunk": None, "--archive": None}
+    positional = []
+    args = iter(args)
+    for arg in args:
+        if arg in options:
+            options[arg] = next(args, None)
+            if options[arg] is None:
+                print(usage)
+                return 2
+        else:
+            positional.append(arg)
+    try:
+        config_file, seed_range = positional
+        first, end = (int(v) for v in seed_range.split(":"))
+        workers = options["--workers"]
+        workers = int(workers) if workers is not None else None
+        chunk = options["--chunk"]
+        chunk = int(chunk) if chunk is not None else None
+    except ValueError:
+        print(usage)
+        return 2
+    # 0 workers would silently mean "every CPU", 0 seeds per chunk fails
+    if (workers is not None and workers < 1) or (
+        chunk is not None and chunk < 1
+    ):
+        print(usage)
+        return 2
+
+    config = get_config(config_file)
+    report = run_batch(
+        config, range(first, end), workers, chunk, options["--archive"]
+    )
+    unsolvable = [r.seed for r in report.results if r.path_length is None]
+    where = options["--archive"] or os.path.dirname(config["OUTPUT_FILE"])
+    print(
+        f"{len(report.results)} mazes in {report.elapsed:.2f}s "
+        f"({report.mazes_per_second:.1f} mazes/s, {report.workers} workers)"
+        f" -> {where or '.'}"
+    )
+    if unsolvable:
+        print(f"no path for seeds: {', '.join(map(str, unsolvable))}")
+    return 0
+
+
+def serve_mazes(args):
+    """
+    serve mode: answer generate / solve requests over HTTP until
+    interrupted. Returns the exit code
+    """
+    usage = (
+        "Correct usage: python3 a_maze_ing.py serve [--host HOST] "
+        "[--port PORT | --unix SOCKET] [--workers N] [--queue N] "
+        "[--cache-mb N]"
+    )
+    options = {
+        "--host": "127.0.0.1",
+        "--port": "8042",
+        "--unix": None,
+        "--workers": None,
+        "--queue": "64",
+        "--cache-mb": "256",
+    }
+    args = iter(args)
+    for arg in args:
+        if arg not in options:
+            print(usage)
+            return 2
+        options[arg] = next(args, None)
+    try:
+        port = int(options["--port"])
+        workers = options["--workers"]
+        workers = int(workers) if workers is not None else None
+        queue = int(options["--queue"])
+        cache_bytes = int(options["--cache-mb"]) * 1024 * 1024
+    except (TypeError, ValueError):
+        print(usage)
+        return 2
+    serve(
+        options["--host"],
+        port,
+        options["--unix"],
+        workers,
+        queue,
+        cache_bytes,
+    )
+    return 0
+
+
+def run_headless(config, config_time, render=False, as_json=False):
+    """
+    Headless mode: generate and solve (or read both from the cache),
+    optionally render and write OUTPUT_FILE once, then print the time
+    spent in each phase (as one JSON object with as_json)
+    """
+    timings = {"config_parsing": config_time}
+    path = None
+    cache = None
+    # keep stdout for the JSON report only
+    with redirect_stdout(sys.stderr if as_json else sys.stdout):
+        if config["ALGORITHM"] == "eller":
+            start = time.perf_counter()
+            stream_maze(config)
+            # generation and writing are one streamed step
+            timings["generation"] = time.perf_counter() - start
+        else:
+            cache = get_cache(config)
+            mm, path = load_or_generate(config, cache, timings)
+
+            if render:
+                start = time.perf_counter()
+                drawing = mm.renderer.render(mm, path or [])
+                timings["rendering"] = time.perf_counter() - start
+                if not as_json:
+                    print(drawing)
+
+            start = time.perf_counter()
+            mm.save_maze_file(path, background=False)
+            timings["file_writing"] = time.perf_counter() - start
+
+    report = {
+        "output_file": config["OUTPUT_FILE"],
+        "width": config["WIDTH"],
+        "height": config["HEIGHT"],
+        "algorithm": config["ALGORITHM"],
+        "solver": config["SOLVER"],
+        "perfect": config["PERFECT"],
+        "seed": config["SEED"],
+        "path_length": len(path) - 1 if path else None,
+        # None without CACHE_DIR
+        "cache": None,
+        "timings": timings,
+    }
+    if cache:
+        report["cache"] = "hit" if "cache_load" in timings else "miss"
+    if as_json:
+        print(json.dumps(report))
+        return
+    print(f"Maze written to {config['OUTPUT_FILE']}")
+    if cache:
+        print(f"  cache {report['cache']}")
+    for phase, seconds in timings.items():
+        print(f"  {phase:<15} {seconds:.6f}s")
 
 
 def main():
     """
     Main entrypoint of the programm
     """
-    print_banner()
+    # solve existing maze files, no generation and no menu
+    if len(sys.argv) >= 2 and sys.argv[1] == "solve":
+        sys.exit(solve_files(sys.argv[2:]))
+    # generate many mazes at once, no menu
+    if len(sys.argv) >= 2 and sys.argv[1] == "batch":
+        sys.exit(batch_files(sys.argv[2:]))
+    # long running generate / solve service
+    if len(sys.argv) >= 2 and sys.argv[1] == "serve":
+        sys.exit(serve_mazes(sys.argv[2:]))
+
+    # no menu when asked or when there is no terminal (cron, CI)
+    flags = {"--headless", "--render", "--json", "--profile", "--trace-memory"}
+    options = []
+    args = []
+    instrument_file = None
+    argv = iter(sys.argv[1:])
+    for arg in argv:
+        if arg == "--instrument":
+            instrument_file = next(argv, None)
+        elif arg in flags:
+            options.append(arg)
+        else:
+            args.append(arg)
+    headless = "--headless" in options or not sys.stdin.isatty()
+
+    if not headless:
+        print_banner()
 
-    if len(sys.argv) >= 2:
-        config_file = sys.argv[1]
+    if len(args) == 1:
+        config_file = args[0]
     else:
-        print("Correct usage: python3 a_maze_ing.py <config_file>")
+        print(
+            "Correct usage: python3 a_maze_ing.py <config_file> "
+            "[--headless [--render] [--json]] "
+            "[--instrument FILE [--profile] [--trace-memory]]"
+        )
         exit()
 
+    # phase timings and counters, dumped as JSON when leaving
+    if instrument_file:
+        instrumentation.enable(
+            profile=["*"] if "--profile" in options else [],
+            trace_memory=["*"] if "--trace-memory" in options else [],
+        )
+
+    start = time.perf_counter()
     config = get_config(config_file)
     config["COLOR"] = "Default"
+    config_time = time.perf_counter() - start
 
+    if headless:
+        run_headless(
+            config, config_time, "--render" in options, "--json" in options
+        )
+        if instrument_file:
+            instrumentation.dump_json(instrument_file)
+        return
 
-    mm = MazeManager(config)
-    mm.generate_maze_dfs()
-    path = calculate_path(mm)
+    # Eller's algorithm never holds the whole maze: write it and leave
+    if config["ALGORITHM"] == "eller":
+        stream_maze(config)
+        print(f"Maze streamed to {config['OUTPUT_FILE']}")
+        return
+
+    mm, path = load_or_generate(config, get_cache(config))
+    mm.save_maze_file(path)
 
     show_path = True
+    # top-left cell of the view on mazes bigger than the terminal
+    top, left = 0, 0
 
     while True:
-        clear_screen()
-        print_banner()
-        display_maze(mm, path, show_path)
-        print_menu(show_path, config["COLOR"])
+        view = get_view(mm, top, left)
+        draw_screen(mm, path, show_path, view)
+        print_menu(show_path, config["COLOR"], mm, view)
 
         choice = get_input().upper()
 
         if choice == "1":
-            mm = generate_maze(config)
+            mm = generate_maze(mm)
             path = calculate_path(mm)
-            clear_screen()
-            print_banner()
-            display_maze(mm, path, show_path)
+            mm.save_maze_file(path)
+            draw_screen(mm, path, show_path, get_view(mm, top, left))
+
+        elif choice in ("UP", "DOWN", "LEFT", "RIGHT"):
+            if view is not None:
+                top, left = pan_view(view, choice)
 
         elif choice == "2":
             show_path = not show_path
 
+        elif choice == "4":
+            mm = animate_maze(mm)
+            path = calculate_path(mm)
+            mm.save_maze_file(path)
+
         elif choice == "3":
             color_map = {"1": "Default", "2": "Red", "3": "Green", "4": "Yellow"}
 
             while True:
-                clear_screen()
-                print_banner()
-                display_maze(mm, path, show_path)
+                draw_screen(mm, path, show_path, get_view(mm, top, left))
                 print_color_submenu()
 
                 color_choice = get_input().upper()
@@ -173,6 +588,7 @@ def main():
 
                 if color_choice in color_map:
                     config["COLOR"] = color_map[color_choice]
+                    mm.color = config["COLOR"]
                     break
 
         elif choice == "Q" or choice == "\x1b":  # \x1b = ESC
@@ -180,5 +596,11 @@ def main():
             print("\nGoodbye!\n")
             break
 
+    mm.close_output()
+    if instrument_file:
+        instrumentation.dump_json(instrument_file)
+
 
-main()
+if __name__ == "__main__":
+    # worker processes of the batch mode may import this file again
+    main()
@@ -0,0 +1,261 @@
+"""
+Docstring for benchmarks.bench
+
+Benchmark suite: generation (DFS), make_imperfect, BFS, rendering,
+output file writing and the output validator, over a ladder of maze
+sizes, for perfect and imperfect mazes, with fixed seeds.
+
+Every case reports its best time (timeit style auto-ranging) and its
+peak traced memory. Results are written as JSON and compared with a
+stored baseline: a case slower or bigger than the baseline by more than
+the tolerance makes the run fail.
+
+Usage:
+    python3 benchmarks/bench.py [--sizes 20x50,100x100] [--output FILE]
+                                [--baseline FILE] [--save-baseline]
+                                [--tolerance 0.5] [--no-memory]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "ressources"))
+
+from mazegen import BFS, MazeManager, MazeRender  # noqa: E402
+
+SIZES: List[Tuple[int, int]] = [
+    (20, 50),
+    (100, 100),
+    (500, 500),
+    (1000, 1000),
+    (2000, 2000),
+]
+SEED = 42
+BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+# a case gets repeated until it ran that long (or MAX_REPEATS times)
+MIN_TOTAL = 0.5
+MAX_REPEATS = 7
+# slowdowns smaller than this are timer noise, never regressions
+MIN_DELTA = {"seconds": 0.005, "peak_bytes": 64 * 1024}
+
+# a case: name -> (setup, run); setup() builds the arguments of run
+Case = Tuple[Callable[[], Any], Callable[[Any], Any]]
+
+
+def manager(h: int, w: int, perfect: bool, out: str) -> MazeManager:
+    config = {
+        "HEIGHT": h,
+        "WIDTH": w,
+        "ENTRY": (0, 0),
+        "EXIT": (h - 1, w - 1),
+        "OUTPUT_FILE": out,
+        "PERFECT": perfect,
+        "SEED": SEED,
+        "COLOR": "Default",
+    }
+    # silence the "42 pattern omitted" notice of the small sizes
+    with contextlib.redirect_stdout(io.StringIO()):
+        return MazeManager(config)
+
+
+def cases(h: int, w: int, perfect: bool, tmp: str) -> Dict[str, Case]:
+    """
+    The benchmarked calls for one size and PERFECT value. They share one
+    generated and solved maze; only make_imperfect needs a fresh copy.
+    """
+    import output_validator
+
+    out = os.path.join(tmp, f"maze_{h}x{w}_{perfect}.txt")
+    mm = manager(h, w, perfect, out)
+    mm.generate_maze_dfs(SEED)
+    path = BFS().shortest_path(mm.maze, h, w, mm.entry, mm.exit)
+    mm.save_maze_file(path, background=False)
+
+    perfect_mm = manager(h, w, True, out)
+    perfect_mm.generate_maze_dfs(SEED)
+    perfect_cells = bytes(perfect_mm.maze.cells)
+
+    def make_imperfect_setup():
+        # loops are added to the perfect maze of the same seed
+        perfect_mm.maze.cells[:] = perfect_cells
+        perfect_mm.rng.seed(SEED)
+        return perfect_mm
+
+    def validate(file):
+        with contextlib.redirect_stdout(io.StringIO()):
+            if output_validator.validate(file):
+                raise RuntimeError(f"{file} is not a valid maze")
+
+    result: Dict[str, Case] = {
+        "generate_dfs": (
+            lambda: manager(h, w, perfect, out),
+            lambda m: m.generate_maze_dfs(SEED),
+        ),
+        "bfs": (
+            lambda: mm,
+            lambda m: BFS().shortest_path(m.maze, h, w, m.entry, m.exit),
+        ),
+        "render": (
+            # a new renderer: no cached drawing
+            lambda: MazeRender(out, mm.entry, mm.exit),
+            lambda renderer: renderer.render(mm, path),
+        ),
+        "save_maze_file": (
+            lambda: mm,
+            lambda m: m.save_maze_file(path, background=False),
+        ),
+        "validator": (lambda: out, validate),
+    }
+    if not perfect:
+        result["make_imperfect"] = (
+            make_imperfect_setup,
+            lambda m: m.make_imperfect(),
+        )
+    return result
+
+
+def measure(case: Case, memory: bool) -> Dict[str, Any]:
+    """Best time over the repeats, then the peak memory of one run"""
+    setup, run = case
+    best = float("inf")
+    total = 0.0
+    repeats = 0
+    while repeats < MAX_REPEATS and (repeats == 0 or total < MIN_TOTAL):
+        args = setup()
+        start = time.perf_counter()
+        run(args)
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        total += elapsed
+        repeats += 1
+    result: Dict[str, Any] = {"seconds": best, "repeats": repeats}
+    if memory:
+        args = setup()
+        tracemalloc.start()
+        try:
+            run(args)
+            result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_suite(sizes: List[Tuple[int, int]], memory: bool) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for h, w in sizes:
+            for perfect in (True, False):
+                kind = "perfect" if perfect else "imperfect"
+                for name, case in cases(h, w, perfect, tmp).items():
+                    key = f"{name}/{kind}/{h}x{w}"
+                    results[key] = measure(case, memory)
+                    line = f"{key:<38} {results[key]['seconds']:.6f}s"
+                    if memory:
+                        line += f" {results[key]['peak_bytes'] / 1e6:9.2f} MB"
+                    print(line, flush=True)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "seed": SEED,
+        },
+        "results": results,
+    }
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """Regressions of results against baseline, as messages"""
+    failures: List[str] = []
+    for key, base in baseline["results"].items():
+        now = results["results"].get(key)
+        if now is None:
+            continue
+        for metric in ("seconds", "peak_bytes"):
+            if metric not in now or metric not in base:
+                continue
+            limit = base[metric] * (1 + tolerance)
+            limit = max(limit, base[metric] + MIN_DELTA[metric])
+            if now[metric] > limit:
+                failures.append(
+                    f"{key} {metric}: {now[metric]:.6g} > "
+                    f"{base[metric]:.6g} (+{tolerance:.0%})"
+                )
+    return failures
+
+
+def parse_sizes(text: str) -> List[Tuple[int, int]]:
+    sizes = []
+    for size in text.split(","):
+        h, w = size.lower().split("x")
+        sizes.append((int(h), int(w)))
+    return sizes
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[3])
+    parser.add_argument(
+        "--sizes",
+        type=parse_sizes,
+        default=SIZES,
+        help="HEIGHTxWIDTH list (default: %(default)s)",
+    )
+    parser.add_argument("--output", help="write the results to this file")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store the results as the new baseline",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="allowed slowdown / growth, 0.5 = +50%% (default)",
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="skip tracemalloc runs"
+    )
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, not args.no_memory)
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            f.write(text + "\n")
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except OSError:
+        print(f"no baseline at {args.baseline}, nothing to compare")
+        return 0
+    failures = compare(results, baseline, args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    if failures:
+        return 1
+    print("no regression against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,11 @@ and process the checks of the values
 """
 
 from typing import Any
+from mazegen.generators import GENERATORS
+from mazegen.shortest_path import SOLVERS
+
+# generation algorithms accepted in the ALGORITHM key
+ALGORITHMS = tuple(GENERATORS)
 
 
 def check_values(c: dict[str, Any]) -> dict[str, Any]:
@@ -39,6 +44,18 @@ def check_values(c: dict[str, Any]) -> dict[str, Any]:
         raise BaseException("Entry / exit must have positive values Really..?")
     elif c["ENTRY"] == c["EXIT"]:
         raise BaseException("Entry and exit can not be same. Are you stupid ?")
+    elif not 0 <= c.get("LOOP_DENSITY", 0.35) <= 1:
+        raise BaseException("LOOP_DENSITY must be between 0 and 1")
+    elif c["ALGORITHM"] not in ALGORITHMS:
+        raise BaseException(
+            f"Unknown ALGORITHM {c['ALGORITHM']!r}, "
+            f"expected one of: {', '.join(ALGORITHMS)}"
+        )
+    elif c["SOLVER"] not in SOLVERS:
+        raise BaseException(
+            f"Unknown SOLVER {c['SOLVER']!r}, "
+            f"expected one of: {', '.join(SOLVERS)}"
+        )
 
     return c
 
@@ -49,7 +66,9 @@ def apply_types(config_data: dict[str, Any]) -> dict[str, Any]:
     """
 
     # string_exected_keys = ["OUTPUT_FILE"]
-    int_exected_keys = ["WIDTH", "HEIGHT", "SEED"]
+    name_exected_keys = ["ALGORITHM", "SOLVER"]
+    int_exected_keys = ["WIDTH", "HEIGHT", "SEED", "CACHE_MAX_MB"]
+    float_exected_keys = ["LOOP_DENSITY"]
     tuple_exected_keys = ["ENTRY", "EXIT"]
     bool_exected_keys = ["PERFECT"]
 
@@ -58,6 +77,9 @@ def apply_types(config_data: dict[str, Any]) -> dict[str, Any]:
         if c in int_exected_keys:
             config_data[c] = int(v)
 
+        elif c in float_exected_keys:
+            config_data[c] = float(v)
+
         elif c in tuple_exected_keys:
             v = v.split(",")
             col = int(v[0].strip())
@@ -68,6 +90,9 @@ def apply_types(config_data: dict[str, Any]) -> dict[str, Any]:
             # Convert string to proper boolean
             config_data[c] = v.strip().lower() in ("true", "1", "yes", "on")
 
+        elif c in name_exected_keys:
+            config_data[c] = v.strip().lower()
+
     return config_data
 
 
@@ -88,6 +113,8 @@ def get_config(file_path: str) -> dict[str, str]:
         print("File not found")
 
     apply_types(config_data)
+    config_data.setdefault("ALGORITHM", "dfs")
+    config_data.setdefault("SOLVER", "bfs")
     try:
         check_values(config_data)
     except Exception as e:
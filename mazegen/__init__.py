@@ -1,8 +1,70 @@
 from .models import MazeCell
 from .render import MazeRender
 from .main import MazeManager
-from .shortest_path import BFS
+from .shortest_path import (
+    BFS,
+    AStar,
+    BidirectionalBFS,
+    DistanceField,
+    Solver,
+    SOLVERS,
+    TreePathIndex,
+)
+from .eller import EllerGenerator
+from .generators import (
+    GENERATORS,
+    STEPPERS,
+    iter_engine,
+    register_generator,
+    register_stepper,
+)
+from . import bulk  # noqa: F401  (registers the NumPy engines)
+from .cache import MazeCache
+from .writer import OutputWriter
+from .binary import BinaryMaze, load_binary, save_binary
+from .hexfile import HexMaze, SolveResult, solve_file
+from .areas import OpenAreas, close_open_areas, find_open_areas
+from .batch import BatchReport, MazeResult, run_batch
+from .instrument import Instrumentation, instrumentation
+from .service import MazeService, serve
+from .tiled import TiledGenerator
 
-__all__ = ["MazeCell", "MazeManager", "MazeRender", "BFS"]
+__all__ = [
+    "MazeCell",
+    "MazeManager",
+    "MazeRender",
+    "BFS",
+    "AStar",
+    "BidirectionalBFS",
+    "Solver",
+    "DistanceField",
+    "TreePathIndex",
+    "SOLVERS",
+    "EllerGenerator",
+    "GENERATORS",
+    "register_generator",
+    "STEPPERS",
+    "iter_engine",
+    "register_stepper",
+    "MazeCache",
+    "OutputWriter",
+    "BinaryMaze",
+    "load_binary",
+    "save_binary",
+    "HexMaze",
+    "SolveResult",
+    "solve_file",
+    "OpenAreas",
+    "close_open_areas",
+    "find_open_areas",
+    "BatchReport",
+    "MazeResult",
+    "run_batch",
+    "Instrumentation",
+    "instrumentation",
+    "MazeService",
+    "serve",
+    "TiledGenerator",
+]
 __version__ = "1.0.0"
 __author__ = "Eloi Berlinger, Weijia Han"
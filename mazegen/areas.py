@@ -0,0 +1,106 @@
+"""
+Docstring for mazegen.areas
+
+The 3x3 open area rule: a maze can not have a 3x3 block of cells with
+all of its 12 inner walls open.
+
+Each maze row becomes two Python integers used as bitsets (bit c set
+when cell c has its east / south wall open). Shifting and and-ing them
+checks the whole row of 3x3 blocks at once, word by word in C, so the
+grid is scanned in one pass without a per-cell loop.
+"""
+
+from typing import List, Tuple
+from .models import MazeGrid, EAST, WEST, SOUTH
+
+# mask -> b"1" when the side is open, b"0" otherwise
+EAST_BITS = bytes(ord("1") if m & EAST else ord("0") for m in range(256))
+SOUTH_BITS = bytes(ord("1") if m & SOUTH else ord("0") for m in range(256))
+
+
+def _row_bits(digits: bytes) -> int:
+    """b"0"/b"1" digits of a row -> bitset, column c on bit c"""
+    return int(digits[::-1], 2) if digits else 0
+
+
+class OpenAreas:
+    """
+    Bitsets of the open east / south walls of a grid, row by row
+
+    blocks(r) has bit c set when the 3x3 block whose top-left cell is
+    (r, c) is fully open.
+    """
+
+    def __init__(self, grid: MazeGrid) -> None:
+        self.grid = grid
+        w = grid.width
+        cells = bytes(grid.cells)
+        east = cells.translate(EAST_BITS)
+        south = cells.translate(SOUTH_BITS)
+        self.east = [
+            _row_bits(east[r * w:(r + 1) * w]) for r in range(grid.height)
+        ]
+        self.south = [
+            _row_bits(south[r * w:(r + 1) * w]) for r in range(grid.height)
+        ]
+
+    def blocks(self, r: int) -> int:
+        east = self.east
+        south = self.south
+        # cells opened east twice in a row, south three times in a row
+        h0, h1, h2 = (e & (e >> 1) for e in east[r:r + 3])
+        v0, v1 = (s & (s >> 1) & (s >> 2) for s in south[r:r + 2])
+        return h0 & h1 & h2 & v0 & v1
+
+    def find(self) -> List[Tuple[int, int]]:
+        """Top-left cells of every fully open 3x3 block"""
+        found: List[Tuple[int, int]] = []
+        for r in range(self.grid.height - 2):
+            bits = self.blocks(r)
+            while bits:
+                low = bits & -bits
+                found.append((r, low.bit_length() - 1))
+                bits ^= low
+        return found
+
+    def close(self) -> int:
+        """
+        Close walls until no 3x3 block is fully open, returns how many.
+
+        Blocks are handled in row-major order. The wall closed for a
+        block is the east wall of its center cell: it lies on a fully
+        open 2x2 square, so its two cells stay connected through the
+        other three walls and the maze stays connected. Closing walls
+        never opens a block, so one pass is enough.
+        """
+        cells = self.grid.cells
+        w = self.grid.width
+        closed = 0
+        for r in range(self.grid.height - 2):
+            bits = self.blocks(r)
+            while bits:
+                c = (bits & -bits).bit_length() - 1
+                # east wall of the center cell (r + 1, c + 1)
+                index = (r + 1) * w + c + 1
+                cells[index] &= ~EAST
+                cells[index + 1] &= ~WEST
+                self.east[r + 1] &= ~(1 << (c + 1))
+                closed += 1
+                bits = self.blocks(r) & ~((2 << c) - 1)
+        if closed:
+            self.grid.touch()
+        return closed
+
+
+def find_open_areas(grid: MazeGrid) -> List[Tuple[int, int]]:
+    """Top-left cells of every fully open 3x3 block of grid"""
+    return OpenAreas(grid).find()
+
+
+def close_open_areas(grid: MazeGrid) -> int:
+    """Break every fully open 3x3 block of grid (see OpenAreas.close)"""
+    return OpenAreas(grid).close()
+
+
+if __name__ == "__main__":
+    exit()
@@ -0,0 +1,157 @@
+"""
+Docstring for mazegen.batch
+
+Generate, solve and write many mazes (one per seed) on a process pool.
+
+Seeds are sent to the workers by chunks. Each maze only depends on its
+own seed (a fresh MazeManager is seeded with it), and the results are
+collected in seed order, so the files are the same whatever the number
+of workers. Per-seed files are written by the workers themselves; an
+archive is written by the parent, in seed order.
+"""
+
+import io
+import os
+import tarfile
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+from .main import MazeManager
+from .shortest_path import SOLVERS
+
+
+@dataclass
+class MazeResult:
+    """One maze of a batch"""
+
+    seed: int
+    # output file, or member name in the archive
+    file: str
+    # moves of the shortest path, None when there is none
+    path_length: Optional[int]
+    generation_time: float
+
+
+@dataclass
+class BatchReport:
+    """Results of run_batch, in seed order"""
+
+    results: List[MazeResult] = field(default_factory=list)
+    elapsed: float = 0.0
+    workers: int = 0
+
+    @property
+    def mazes_per_second(self) -> float:
+        return len(self.results) / self.elapsed if self.elapsed else 0.0
+
+
+def seed_file(output_file: str, seed: int) -> str:
+    """OUTPUT_FILE with the seed before its extension (maze_7.txt)"""
+    root, ext = os.path.splitext(output_file)
+    return f"{root}_{seed}{ext}"
+
+
+def _solve(mm: MazeManager) -> Optional[List[Tuple[int, int]]]:
+    return SOLVERS[mm.solver]().shortest_path(
+        maze=mm.maze,
+        height=mm.height,
+        width=mm.width,
+        start=mm.entry,
+        end=mm.exit,
+    )
+
+
+def _run_chunk(
+    config: Dict[str, Any], seeds: Sequence[int], to_archive: bool
+) -> List[Tuple[MazeResult, Optional[bytes]]]:
+    """
+    Worker: generate, solve and write the mazes of a chunk of seeds.
+    With to_archive the HEX text is returned instead of written.
+    """
+    done: List[Tuple[MazeResult, Optional[bytes]]] = []
+    for seed in seeds:
+        file = seed_file(config["OUTPUT_FILE"], seed)
+        mm = MazeManager({**config, "SEED": seed, "OUTPUT_FILE": file})
+        mm.generate()
+        path = _solve(mm)
+        result = MazeResult(
+            seed,
+            os.path.basename(file) if to_archive else file,
+            len(path) - 1 if path else None,
+            mm.generation_time,
+        )
+        if to_archive:
+            text = io.StringIO()
+            mm.renderer.write_maze_text(text, mm.maze, path or [])
+            done.append((result, text.getvalue().encode()))
+        else:
+            mm.save_maze_file(path, background=False)
+            done.append((result, None))
+    return done
+
+
+def run_batch(
+    config: Dict[str, Any],
+    seeds: Sequence[int],
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    archive: Optional[str] = None,
+) -> BatchReport:
+    """
+    Generate, solve and write the maze of every seed.
+
+    Args:
+        config: a MazeManager config, OUTPUT_FILE names the per-seed
+            files (see seed_file)
+        seeds: seeds to run, e.g. range(1000)
+        workers: processes, defaults to the number of CPUs
+        chunk_size: seeds per task, defaults to about 4 tasks per worker
+        archive: write every maze into this tar file (members named
+            like the per-seed files) instead of per-seed files
+    """
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, min(64, len(seeds) // (workers * 4)))
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    config = {"COLOR": "Default", **config}
+    chunks = [
+        seeds[i:i + chunk_size] for i in range(0, len(seeds), chunk_size)
+    ]
+
+    report = BatchReport(workers=workers)
+    start = time.perf_counter()
+    tar = tarfile.open(archive, "w") if archive else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # a bounded window of chunks in flight, consumed in order
+            pending: Deque["Future[Any]"] = deque()
+            next_chunk = 0
+            while next_chunk < len(chunks) or pending:
+                while next_chunk < len(chunks) and len(pending) < 2 * workers:
+                    pending.append(
+                        pool.submit(
+                            _run_chunk,
+                            config,
+                            chunks[next_chunk],
+                            tar is not None,
+                        )
+                    )
+                    next_chunk += 1
+                for result, text in pending.popleft().result():
+                    report.results.append(result)
+                    if tar is not None and text is not None:
+                        info = tarfile.TarInfo(result.file)
+                        info.size = len(text)
+                        tar.addfile(info, io.BytesIO(text))
+    finally:
+        if tar is not None:
+            tar.close()
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+if __name__ == "__main__":
+    exit()
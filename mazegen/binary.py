@@ -0,0 +1,253 @@
+"""
+Docstring for mazegen.binary
+
+Compact binary maze files (.amz), for archiving many mazes.
+
+Layout (little endian):
+    header   HEADER: magic, format version, packing, flags, height,
+             width, entry, exit, seed and generator name
+    cells    PACK_NIBBLE: two cells per byte, even cell in the low
+             nibble (the hex output digits, 42 pattern cells as 0)
+             PACK_BYTE: one mask byte per cell, as in MazeGrid.cells
+    path     only with FLAG_PATH: PATH_HEADER (steps, start) then the
+             moves, 2 bits each (N, E, S, W), 4 per byte
+
+BinaryMaze memory-maps a file. With PACK_BYTE its grid is a zero-copy
+view of the mapping; PACK_NIBBLE cells are unpacked by a few C level
+bytes operations, without any text parsing.
+"""
+
+import mmap
+import struct
+from typing import List, Optional, Tuple
+from .models import (
+    MazeGrid,
+    PATTERN,
+    WALLS,
+    fits_42_pattern,
+    forty_two_coords,
+)
+from .shortest_path import path_to_directions
+
+MAGIC = b"AMZB"
+FORMAT_VERSION = 1
+
+PACK_NIBBLE = 4
+PACK_BYTE = 8
+
+FLAG_PATH = 1
+FLAG_SEED = 2
+FLAG_PATTERN = 4
+
+# magic, version, packing, flags, height, width, entry r, entry c,
+# exit r, exit c, seed, generator name
+HEADER = struct.Struct("<4sBBBx6Iq16s")
+# steps, start r, start c
+PATH_HEADER = struct.Struct("<3I")
+
+MOVE_CODES = {"N": 0, "E": 1, "S": 2, "W": 3}
+MOVE_OFFSETS = ((-1, 0), (0, 1), (1, 0), (0, -1))
+
+# mask -> low nibble / mask -> high nibble, and back
+LOW_NIBBLE = bytes(m & WALLS for m in range(256))
+HIGH_NIBBLE = bytes((m & WALLS) << 4 for m in range(256))
+FROM_HIGH_NIBBLE = bytes(m >> 4 for m in range(256))
+
+
+def _pack_nibbles(cells: bytes) -> bytes:
+    """Two masks per byte: cells[2i] | cells[2i + 1] << 4"""
+    low = cells[0::2].translate(LOW_NIBBLE)
+    high = cells[1::2].translate(HIGH_NIBBLE)
+    if not low:
+        return b""
+    # one big integer OR merges both halves in C
+    merged = int.from_bytes(low, "little") | int.from_bytes(high, "little")
+    return merged.to_bytes(len(low), "little")
+
+
+def _unpack_nibbles(packed: bytes, n: int) -> bytearray:
+    """Inverse of _pack_nibbles for n cells"""
+    cells = bytearray(n)
+    cells[0::2] = packed.translate(LOW_NIBBLE)[:(n + 1) // 2]
+    cells[1::2] = packed.translate(FROM_HIGH_NIBBLE)[:n // 2]
+    return cells
+
+
+def _pack_path(path: List[Tuple[int, int]]) -> bytes:
+    moves = path_to_directions(path)
+    packed = bytearray((len(moves) + 3) // 4)
+    for i, move in enumerate(moves):
+        packed[i >> 2] |= MOVE_CODES[move] << ((i & 3) * 2)
+    return PATH_HEADER.pack(len(moves), *path[0]) + bytes(packed)
+
+
+def save_binary(
+    file: str,
+    grid: MazeGrid,
+    entry: Tuple[int, int],
+    exit: Tuple[int, int],
+    path: Optional[List[Tuple[int, int]]] = None,
+    seed: Optional[int] = None,
+    generator: str = "",
+    packing: int = PACK_NIBBLE,
+) -> None:
+    """
+    Write grid and its metadata as a binary maze file.
+
+    PACK_NIBBLE is half the size of the hex output, PACK_BYTE is twice
+    bigger but loads as a zero-copy view.
+    """
+    if packing not in (PACK_NIBBLE, PACK_BYTE):
+        raise ValueError(f"Unknown packing {packing!r}")
+    name = generator.encode("ascii")
+    if len(name) > 16:
+        raise ValueError("generator name is limited to 16 characters")
+
+    cells = bytes(grid.cells)
+    flags = 0
+    if path:
+        flags |= FLAG_PATH
+    if seed is not None:
+        flags |= FLAG_SEED
+    if PATTERN in cells:
+        flags |= FLAG_PATTERN
+
+    header = HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        packing,
+        flags,
+        grid.height,
+        grid.width,
+        *entry,
+        *exit,
+        seed if seed is not None else 0,
+        name,
+    )
+    with open(file, "wb") as f:
+        f.write(header)
+        f.write(_pack_nibbles(cells) if packing == PACK_NIBBLE else cells)
+        if path:
+            f.write(_pack_path(path))
+
+
+class BinaryMaze:
+    """
+    A memory-mapped binary maze file
+
+    Has height, width and maze like MazeManager, so it can be given to
+    the solvers (maze=...) and to MazeRender.render as is.
+    Close it (or use it as a context manager) to release the mapping.
+    """
+
+    def __init__(self, file: str) -> None:
+        with open(file, "rb") as f:
+            try:
+                self._map: Optional[mmap.mmap] = mmap.mmap(
+                    f.fileno(), 0, access=mmap.ACCESS_READ
+                )
+            except ValueError:
+                raise ValueError(f"{file}: empty maze file")
+        self._view: Optional[memoryview] = memoryview(self._map)
+        # cells slice of _view shared by a PACK_BYTE grid
+        self._cells_view: Optional[memoryview] = None
+        try:
+            self._parse(file)
+        except BaseException:
+            self.close()
+            raise
+
+    def _parse(self, file: str) -> None:
+        view = self._view
+        if len(view) < HEADER.size:
+            raise ValueError(f"{file}: truncated maze header")
+        (
+            magic,
+            version,
+            packing,
+            flags,
+            height,
+            width,
+            entry_r,
+            entry_c,
+            exit_r,
+            exit_c,
+            seed,
+            name,
+        ) = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f"{file}: not a binary maze file")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{file}: unsupported format version {version}")
+        if packing not in (PACK_NIBBLE, PACK_BYTE):
+            raise ValueError(f"{file}: unknown packing {packing}")
+
+        self.height: int = height
+        self.width: int = width
+        self.entry: Tuple[int, int] = (entry_r, entry_c)
+        self.exit: Tuple[int, int] = (exit_r, exit_c)
+        self.seed: Optional[int] = seed if flags & FLAG_SEED else None
+        self.generator: str = name.rstrip(b"\0").decode("ascii")
+        self.packing: int = packing
+
+        n = height * width
+        start = HEADER.size
+        size = n if packing == PACK_BYTE else (n + 1) // 2
+        end = start + size
+        if len(view) < end:
+            raise ValueError(f"{file}: truncated maze cells")
+
+        if packing == PACK_BYTE:
+            self._cells_view = view[start:end]
+            self.maze = MazeGrid.from_buffer(height, width, self._cells_view)
+        else:
+            cells = _unpack_nibbles(self._map[start:end], n)
+            self.maze = MazeGrid.from_buffer(height, width, cells)
+            if flags & FLAG_PATTERN and fits_42_pattern(height, width):
+                for r, c in forty_two_coords(height, width):
+                    self.maze.cells[r * width + c] |= PATTERN
+
+        self._path_offset = end if flags & FLAG_PATH else -1
+
+    @property
+    def path(self) -> Optional[List[Tuple[int, int]]]:
+        """The stored path as coordinates, None when there is none"""
+        if self._path_offset < 0:
+            return None
+        view = self._view
+        steps, r, c = PATH_HEADER.unpack_from(view, self._path_offset)
+        start = self._path_offset + PATH_HEADER.size
+        moves = view[start:start + (steps + 3) // 4]
+        if len(moves) * 4 < steps:
+            raise ValueError("truncated maze path")
+        path = [(r, c)]
+        for i in range(steps):
+            dr, dc = MOVE_OFFSETS[(moves[i >> 2] >> ((i & 3) * 2)) & 3]
+            r, c = r + dr, c + dc
+            path.append((r, c))
+        return path
+
+    def close(self) -> None:
+        """Release the views and the file mapping"""
+        if self._view is None:
+            return
+        if self._cells_view is not None:
+            self._cells_view.release()
+        self._view.release()
+        self._view = None
+        self._map.close()
+
+    def __enter__(self) -> "BinaryMaze":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def load_binary(file: str) -> BinaryMaze:
+    """Open a binary maze file (see BinaryMaze)"""
+    return BinaryMaze(file)
+
+
+if __name__ == "__main__":
+    exit()
@@ -0,0 +1,231 @@
+"""
+Docstring for mazegen.bulk
+
+NumPy engines for very large perfect mazes (binary tree, sidewinder).
+Every carving decision of a block of rows is taken in a few vectorized
+operations on the wall masks, written straight into grid.cells.
+The texture is strongly biased: use them for load tests, not for play.
+"""
+
+import random
+from typing import Callable, Dict, List
+from .generators import register_generator
+from .models import MazeGrid, NORTH, EAST, SOUTH, WEST, PATTERN
+
+try:
+    import numpy as np
+except ImportError:  # only the engines of this module need numpy
+    np = None
+
+# cells handled per vectorized block (bounds the temporary arrays)
+BLOCK_CELLS = 1 << 22
+
+
+def _masks(grid: MazeGrid, rng: random.Random):
+    """Zero-copy (height, width) uint8 view of grid.cells + numpy rng"""
+    if np is None:
+        raise ImportError("the binary_tree / sidewinder engines need numpy")
+    masks = np.frombuffer(grid.cells, dtype=np.uint8)
+    masks = masks.reshape(grid.height, grid.width)
+    return masks, np.random.default_rng(rng.getrandbits(64))
+
+
+def _tree_root_binary(cells: bytearray, w: int, index: int) -> int:
+    """Follow north / east parents up to the root of a binary tree"""
+    while True:
+        mask = cells[index]
+        if mask & NORTH:
+            index -= w
+        elif mask & EAST:
+            index += 1
+        else:
+            return index
+
+
+def _tree_root_sidewinder(cells: bytearray, w: int, index: int) -> int:
+    """Follow runs and their north links up to a root run (first cell)"""
+    while True:
+        start = index
+        while cells[start] & WEST:
+            start -= 1
+        index = start
+        while not cells[index] & NORTH:
+            if not cells[index] & EAST:
+                return start
+            index += 1
+        index -= w
+
+
+def _join_orphans(
+    grid: MazeGrid,
+    roots: List[int],
+    tree_root: Callable[[bytearray, int, int], int],
+) -> None:
+    """
+    Connect the extra trees left by the 42 pattern.
+
+    The vectorized pass gives a forest: roots[0] is the main tree and
+    every other root is a tree cut by the pattern. Each of them is
+    joined, through one wall of its component, to a cell of another
+    component (union-find on the roots), so no loop is created.
+    """
+    cells = grid.cells
+    w = grid.width
+    n = len(cells)
+    if len(roots) < 2:
+        return
+    offsets = ((NORTH, -w), (SOUTH, w), (EAST, 1), (WEST, -1))
+
+    parent: Dict[int, int] = {root: root for root in roots}
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for orphan in roots[1:]:
+        if find(orphan) == find(roots[0]):
+            continue
+
+        # cells of the orphan component (all trees already joined to it)
+        seen = {orphan}
+        component = [orphan]
+        for u in component:
+            mask = cells[u]
+            for side, offset in offsets:
+                if mask & side and u + offset not in seen:
+                    seen.add(u + offset)
+                    component.append(u + offset)
+
+        for u in component:
+            col = u % w
+            for side, back, v, inside in (
+                (NORTH, SOUTH, u - w, u >= w),
+                (SOUTH, NORTH, u + w, u + w < n),
+                (EAST, WEST, u + 1, col < w - 1),
+                (WEST, EAST, u - 1, col > 0),
+            ):
+                if not inside or v in seen or cells[v] & PATTERN:
+                    continue
+                other = find(tree_root(cells, w, v))
+                cells[u] |= side
+                cells[v] |= back
+                parent[find(orphan)] = other
+                break
+            else:
+                continue
+            break
+
+
+@register_generator("binary_tree")
+def generate_binary_tree(grid: MazeGrid, rng: random.Random) -> None:
+    """
+    Binary tree: every cell opens its north or its east wall.
+
+    Cells that can only go one way take it; cells the pattern blocks on
+    both sides become extra roots, joined afterwards.
+    """
+    masks, np_rng = _masks(grid, rng)
+    h, w = masks.shape
+    rows = max(1, BLOCK_CELLS // w)
+    roots: List[int] = []
+
+    for r0 in range(0, h, rows):
+        r1 = min(h, r0 + rows)
+        block = masks[r0:r1]
+        free = (block & PATTERN) == 0
+
+        can_n = np.zeros_like(free)
+        if r0 == 0:
+            can_n[1:] = free[1:] & free[:-1]
+        else:
+            above = (masks[r0 - 1:r1 - 1] & PATTERN) == 0
+            can_n[:] = free & above
+        can_e = np.zeros_like(free)
+        can_e[:, :-1] = free[:, :-1] & free[:, 1:]
+
+        coin = np_rng.integers(0, 2, size=free.shape, dtype=np.uint8) == 1
+        go_n = can_n & (coin | ~can_e)
+        go_e = can_e & ~go_n
+
+        block |= go_n.astype(np.uint8) * NORTH
+        block |= go_e.astype(np.uint8) * EAST
+        block[:, 1:] |= go_e[:, :-1].astype(np.uint8) * WEST
+        if r0 == 0:
+            block[:-1] |= go_n[1:].astype(np.uint8) * SOUTH
+        else:
+            masks[r0 - 1:r1 - 1] |= go_n.astype(np.uint8) * SOUTH
+
+        alone = np.flatnonzero(free & ~can_n & ~can_e)
+        roots.extend((alone + r0 * w).tolist())
+
+    # the top right corner is the natural root: keep it as main tree
+    roots.sort(key=lambda index: index != w - 1)
+    _join_orphans(grid, roots, _tree_root_binary)
+
+
+@register_generator("sidewinder")
+def generate_sidewinder(grid: MazeGrid, rng: random.Random) -> None:
+    """
+    Sidewinder: each row is cut into runs of cells opened east, and one
+    random cell of every run opens north. The first row is a single run.
+
+    Runs are found with a cumulative sum over the whole block and the
+    north cell of each run with np.maximum.reduceat on random keys.
+    Runs the pattern keeps from going north become extra roots, joined
+    afterwards.
+    """
+    masks, np_rng = _masks(grid, rng)
+    h, w = masks.shape
+    rows = max(1, BLOCK_CELLS // w)
+    roots: List[int] = []
+
+    for r0 in range(0, h, rows):
+        r1 = min(h, r0 + rows)
+        block = masks[r0:r1]
+        free = (block & PATTERN) == 0
+
+        can_n = np.zeros_like(free)
+        if r0 == 0:
+            can_n[1:] = free[1:] & free[:-1]
+        else:
+            above = (masks[r0 - 1:r1 - 1] & PATTERN) == 0
+            can_n[:] = free & above
+        can_e = free[:, :-1] & free[:, 1:]
+
+        coin = np_rng.integers(0, 2, size=can_e.shape, dtype=np.uint8) == 1
+        go_e = can_e & coin
+        if r0 == 0:
+            go_e[0] = can_e[0]
+
+        # run starts: first column, or after a cell not going east
+        starts = np.ones(free.shape, dtype=bool)
+        starts[:, 1:] = ~go_e
+        flat_starts = np.flatnonzero(starts)
+        run_of = np.cumsum(starts.ravel()) - 1
+
+        # unique random key per cell, -1 when north is closed
+        cols = np.arange(w, dtype=np.int64)
+        keys = np_rng.integers(0, 1 << 31, size=free.shape, dtype=np.int64)
+        keys = np.where(can_n, keys * w + cols, -1).ravel()
+        best = np.maximum.reduceat(keys, flat_starts)
+        go_n = ((keys == best[run_of]) & (keys >= 0)).reshape(free.shape)
+
+        block[:, :-1] |= go_e.astype(np.uint8) * EAST
+        block[:, 1:] |= go_e.astype(np.uint8) * WEST
+        block |= go_n.astype(np.uint8) * NORTH
+        if r0 == 0:
+            block[:-1] |= go_n[1:].astype(np.uint8) * SOUTH
+        else:
+            masks[r0 - 1:r1 - 1] |= go_n.astype(np.uint8) * SOUTH
+
+        # runs with no way north (first cell of the run as root id)
+        lonely = (best < 0) & free.ravel()[flat_starts]
+        roots.extend((flat_starts[lonely] + r0 * w).tolist())
+
+    _join_orphans(grid, roots, _tree_root_sidewinder)
+
+
+if __name__ == "__main__":
+    exit()
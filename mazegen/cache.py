@@ -0,0 +1,179 @@
+"""
+Docstring for mazegen.cache
+
+On-disk cache of generated mazes and their shortest path.
+
+Entries are content addressed: the file name is a hash of every config
+value that changes the result, plus the generator version. An entry
+holds the packed grid, the path and the random generator state after
+generation, so a hit can replace both generation and solving.
+The directory is kept under a size cap, evicting the least recently
+used entries first.
+"""
+
+import hashlib
+import json
+import os
+import random
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from .generators import GENERATOR_VERSION
+from .models import MazeGrid
+from .shortest_path import path_to_directions
+
+# config keys deciding the maze and its path, with their default value
+KEY_DEFAULTS: Dict[str, Any] = {
+    "WIDTH": None,
+    "HEIGHT": None,
+    "SEED": None,
+    "PERFECT": None,
+    "ENTRY": None,
+    "EXIT": None,
+    "ALGORITHM": "dfs",
+    "LOOP_DENSITY": 0.35,
+    "SOLVER": "bfs",
+}
+
+MOVES = {"N": (-1, 0), "E": (0, 1), "S": (1, 0), "W": (0, -1)}
+
+
+@dataclass
+class CachedMaze:
+    """A cache entry: the grid, its path and the rng state to resume"""
+
+    grid: MazeGrid
+    path: Optional[List[Tuple[int, int]]]
+    rng_state: Any
+
+
+class MazeCache:
+    """LRU bounded directory of generated mazes"""
+
+    SUFFIX = ".maze"
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(config: Dict[str, Any]) -> str:
+        """Hash of the normalized config and the generator version"""
+        normalized = {
+            name: config.get(name, default)
+            for name, default in KEY_DEFAULTS.items()
+        }
+        normalized["GENERATOR_VERSION"] = GENERATOR_VERSION
+        text = json.dumps(normalized, sort_keys=True)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def load(self, config: Dict[str, Any]) -> Optional[CachedMaze]:
+        """
+        Return the entry for this config, None on a miss. A damaged entry
+        is a miss too, and is removed.
+        """
+        file = self._file(self.key(config))
+        try:
+            with open(file, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            entry = self._parse(data)
+        except (KeyError, IndexError, TypeError, ValueError):
+            entry = None
+        if entry is None:
+            try:
+                os.unlink(file)
+            except OSError:
+                pass
+            return None
+
+        # mark as recently used
+        os.utime(file)
+        return entry
+
+    @staticmethod
+    def _parse(data: bytes) -> Optional[CachedMaze]:
+        """Entry from the file content, None when the cells do not fit"""
+        line, _, cells = data.partition(b"\n")
+        header = json.loads(line)
+
+        height, width = header["height"], header["width"]
+        if len(cells) != height * width:
+            return None
+        grid = MazeGrid(height, width)
+        grid.cells[:] = cells
+
+        path: Optional[List[Tuple[int, int]]] = None
+        if header["path"] is not None:
+            r, c = header["start"]
+            path = [(r, c)]
+            for move in header["path"]:
+                dr, dc = MOVES[move]
+                r, c = r + dr, c + dc
+                path.append((r, c))
+
+        state = header["rng_state"]
+        rng_state = (state[0], tuple(state[1]), state[2])
+        # raises on a state the generator can not resume from
+        random.Random().setstate(rng_state)
+        return CachedMaze(grid, path, rng_state)
+
+    def store(
+        self,
+        config: Dict[str, Any],
+        grid: MazeGrid,
+        path: Optional[List[Tuple[int, int]]],
+        rng_state: Any,
+    ) -> None:
+        """Save an entry (atomically) then enforce the size cap"""
+        header = {
+            "height": grid.height,
+            "width": grid.width,
+            "start": list(path[0]) if path else None,
+            "path": "".join(path_to_directions(path)) if path else None,
+            "rng_state": rng_state,
+        }
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps(header).encode() + b"\n")
+                f.write(grid.cells)
+            os.replace(tmp, self._file(self.key(config)))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used entries while over max_bytes"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.SUFFIX):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+
+        entries.sort()
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+
+
+if __name__ == "__main__":
+    exit()
@@ -0,0 +1,243 @@
+"""
+Docstring for mazegen.eller
+
+Row by row maze generation (Eller's algorithm).
+Only the current row is kept in memory, so a maze of any height can be
+streamed straight into the hex output file.
+"""
+
+import random
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from .models import (
+    EAST,
+    HEX_DIGITS,
+    NORTH,
+    PATTERN,
+    SOUTH,
+    WEST,
+    fits_42_pattern,
+    forty_two_coords,
+)
+
+
+class EllerGenerator:
+    """
+    Eller's algorithm over a height x width maze
+
+    Each cell of the current row belongs to a set (cells already
+    connected together). Adjacent cells of different sets are randomly
+    joined, then every set goes down at least once. The last row joins
+    every remaining set, which makes a perfect maze.
+    The 42 pattern cells are never opened.
+
+    With perfect False, loops are added row by row: a loop_density
+    share of the dead-ends get one more wall opened, like
+    MazeManager.make_imperfect does on a whole grid.
+    """
+
+    def __init__(
+        self,
+        height: int,
+        width: int,
+        rng: random.Random,
+        perfect: bool = True,
+        loop_density: float = 0.35,
+    ) -> None:
+        self.height = height
+        self.width = width
+        self.rng = rng
+        self.perfect = perfect
+        self.loop_density = loop_density
+
+        # 42 pattern cells by row, at most 18 cells
+        self.pattern: Dict[int, Set[int]] = {}
+        if fits_42_pattern(height, width):
+            for r, c in forty_two_coords(height, width):
+                self.pattern.setdefault(r, set()).add(c)
+
+    def rows(self) -> Iterator[bytearray]:
+        """
+        Yield the masks of each finished row, top to bottom.
+        The yielded bytearray is not reused by the generator.
+        """
+        w = self.width
+        rng = self.rng
+        no_pattern: Set[int] = set()
+
+        # set label of each cell coming from the row above (-1: none)
+        labels: List[int] = [-1] * w
+        carried = 0
+        # dead-ends picked for a loop that could not get one yet
+        self._owed = 0
+
+        for r in range(self.height):
+            last = r == self.height - 1
+            blocked = self.pattern.get(r, no_pattern)
+            below = self.pattern.get(r + 1, no_pattern)
+
+            row = bytearray(w)
+            # union-find over the labels of this row
+            parent = list(range(carried))
+
+            def find(x: int) -> int:
+                while parent[x] != x:
+                    parent[x] = parent[parent[x]]
+                    x = parent[x]
+                return x
+
+            for c in range(w):
+                if c in blocked:
+                    row[c] = PATTERN
+                    labels[c] = -1
+                elif labels[c] >= 0:
+                    row[c] = NORTH
+                else:
+                    labels[c] = len(parent)
+                    parent.append(labels[c])
+
+            # join cells horizontally
+            for c in range(w - 1):
+                if c in blocked or c + 1 in blocked:
+                    continue
+                a, b = find(labels[c]), find(labels[c + 1])
+                if a != b:
+                    if not last and rng.random() < 0.5:
+                        continue
+                    parent[b] = a
+                else:
+                    continue
+                row[c] |= EAST
+                row[c + 1] |= WEST
+
+            if last:
+                if not self.perfect:
+                    self._add_loops(row)
+                yield row
+                return
+
+            # cells of each set that can go down (not above the 42)
+            down: Dict[int, List[int]] = {}
+            for c in range(w):
+                if c not in blocked:
+                    cols = down.setdefault(find(labels[c]), [])
+                    if c not in below:
+                        cols.append(c)
+
+            # a set with no way down is joined to its neighbor set,
+            # otherwise it would be cut from the rest of the maze
+            stuck = {root for root, cols in down.items() if not cols}
+            while stuck:
+                progress = False
+                for c in range(w - 1):
+                    if c in blocked or c + 1 in blocked:
+                        continue
+                    a, b = find(labels[c]), find(labels[c + 1])
+                    if a == b or (a not in stuck and b not in stuck):
+                        continue
+                    row[c] |= EAST
+                    row[c + 1] |= WEST
+                    parent[b] = a
+                    down[a] = down[a] + down.pop(b)
+                    stuck.discard(b)
+                    if down[a]:
+                        stuck.discard(a)
+                    progress = True
+                if not progress:
+                    break
+
+            # every set goes down at least once
+            labels = [-1] * w
+            carried = 0
+            for cols in down.values():
+                if not cols:
+                    continue
+                picks = [c for c in cols if rng.random() < 0.5]
+                if not picks:
+                    picks = [rng.choice(cols)]
+                for c in picks:
+                    row[c] |= SOUTH
+                    labels[c] = carried
+                carried += 1
+
+            if not self.perfect:
+                carried = self._add_loops(row, below, labels, carried)
+            yield row
+
+    def _add_loops(
+        self,
+        row: bytearray,
+        below: Optional[Set[int]] = None,
+        labels: Optional[List[int]] = None,
+        carried: int = 0,
+    ) -> int:
+        """
+        Open one more wall of a loop_density share of the dead-ends of a
+        finished row (below is None on the last row: nothing goes down).
+        Returns the number of sets carried to the row below.
+
+        The sets are not told about the opening: a cell opened below
+        starts a new set, so the algorithm still joins every cell once
+        and each opening makes exactly one loop. A dead-end is opened
+        straight through, opposite its open side: with two opposite open
+        walls and no other opening it can not be part of a 3x3 open area,
+        so none can appear. When that wall can not be opened (a dead-end
+        open to the south would need a wall of the row already written),
+        the loop is owed to the next dead-end.
+        """
+        w = self.width
+        rng = self.rng
+        # dead-ends already opened: they must keep two open walls
+        used: Set[int] = set()
+        for c in range(w):
+            mask = row[c]
+            if mask not in (NORTH, EAST, WEST):
+                if mask == SOUTH and rng.random() < self.loop_density:
+                    self._owed += 1
+                continue
+            if rng.random() < self.loop_density:
+                self._owed += 1
+            if not self._owed:
+                continue
+
+            if mask == NORTH:
+                if below is None or labels is None or c in below:
+                    continue
+                row[c] |= SOUTH
+                labels[c] = carried
+                carried += 1
+            else:
+                if mask == WEST:
+                    side, back, nxt = EAST, WEST, c + 1
+                else:
+                    side, back, nxt = WEST, EAST, c - 1
+                if not 0 <= nxt < w or nxt in used or row[nxt] & PATTERN:
+                    continue
+                row[c] |= side
+                row[nxt] |= back
+            used.add(c)
+            self._owed -= 1
+        return carried
+
+    def save_maze_file(
+        self,
+        o_file: str,
+        entry: Tuple[int, int],
+        exit: Tuple[int, int],
+    ) -> None:
+        """
+        Write the maze in the output file HEX format while generating it.
+
+        The shortest path line is left empty: solving needs the whole
+        grid, which is never held in memory here.
+        """
+        with open(o_file, "w") as f:
+            for row in self.rows():
+                f.write(row.translate(HEX_DIGITS).decode())
+                f.write("\n")
+            f.write("\n")
+            f.write(f"{entry[0]},{entry[1]}\n")
+            f.write(f"{exit[0]},{exit[1]}\n")
+
+
+if __name__ == "__main__":
+    exit()
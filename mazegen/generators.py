@@ -0,0 +1,338 @@
+"""
+Docstring for mazegen.generators
+
+Maze generation engines.
+An engine carves a perfect maze into a MazeGrid whose cells are all
+closed, drawing every random choice from the given random.Random, and
+never opens a 42 pattern cell. MazeManager picks one by name in
+GENERATORS and applies PERFECT afterwards.
+"""
+
+import random
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Tuple
+from .eller import EllerGenerator
+from .instrument import instrumentation
+from .models import MazeGrid, NORTH, EAST, SOUTH, WEST, PATTERN
+
+Engine = Callable[[MazeGrid, random.Random], None]
+# carve event: (flat cell index, side whose wall was opened)
+Event = Tuple[int, int]
+Stepper = Callable[[MazeGrid, random.Random], Iterator[Event]]
+
+# bump when an engine gives a different maze for the same seed
+# (part of the maze cache keys)
+# 2: 3x3 open areas of imperfect mazes are closed
+GENERATOR_VERSION = 2
+
+GENERATORS: Dict[str, Engine] = {}
+# step by step versions of some engines (same maze, same random draws)
+STEPPERS: Dict[str, Stepper] = {}
+
+# mask -> 1 for 42 pattern cells, 0 otherwise (initial visited state)
+VISITED_TABLE = bytes(1 if m & PATTERN else 0 for m in range(256))
+
+
+def register_generator(name: str) -> Callable[[Engine], Engine]:
+    """Decorator adding an engine to GENERATORS under `name`"""
+
+    def decorator(engine: Engine) -> Engine:
+        GENERATORS[name] = engine
+        return engine
+
+    return decorator
+
+
+def register_stepper(name: str) -> Callable[[Stepper], Stepper]:
+    """Decorator adding the step by step version of engine `name`"""
+
+    def decorator(stepper: Stepper) -> Stepper:
+        STEPPERS[name] = stepper
+        return stepper
+
+    return decorator
+
+
+def _pattern_indexes(visited: bytearray) -> List[int]:
+    """Sorted flat indexes flagged in a VISITED_TABLE translated grid"""
+    indexes: List[int] = []
+    index = visited.find(1)
+    while index != -1:
+        indexes.append(index)
+        index = visited.find(1, index + 1)
+    return indexes
+
+
+def _random_free_cell(
+    visited: bytearray, free: int, rng: random.Random
+) -> int:
+    """Pick one of the `free` non-pattern cells uniformly"""
+    # the k-th free cell is shifted past every pattern cell before it
+    index = rng.randrange(free)
+    for pattern_index in _pattern_indexes(visited):
+        if pattern_index <= index:
+            index += 1
+    return index
+
+
+def _tree_height(cells: bytearray, w: int, root: int) -> int:
+    """Cells on the longest path from root in a perfect maze (BFS)"""
+    offsets = ((NORTH, -w), (SOUTH, w), (EAST, 1), (WEST, -1))
+    seen = {root}
+    layer = [root]
+    height = 0
+    while layer:
+        height += 1
+        nxt = []
+        for u in layer:
+            mask = cells[u]
+            for side, offset in offsets:
+                if mask & side and u + offset not in seen:
+                    seen.add(u + offset)
+                    nxt.append(u + offset)
+        layer = nxt
+    return height
+
+
+@register_stepper("dfs")
+def iter_dfs(grid: MazeGrid, rng: random.Random) -> Iterator[Event]:
+    """
+    Iterative randomized DFS (recursive backtracker), one carve at a
+    time: yields (cell, side) after opening the `side` wall of cell (and
+    the opposite wall of its neighbor). generate_dfs runs it to the end.
+
+    Cells are flat indexes in grid.cells and visited cells are tracked
+    in a bytearray, so every step is O(1) and the whole generation is
+    linear in the number of cells. The random draws (start cell, then
+    one direction among the free neighbors taken in N, S, E, W order)
+    are the same as the original list based version: a given seed
+    still gives the same maze.
+    """
+    cells = grid.cells
+    w = grid.width
+    n = len(cells)
+
+    # 42 pattern cells are never visited
+    visited = cells.translate(VISITED_TABLE)
+    remaining = n - visited.count(1)
+    if not remaining:
+        return
+
+    # Choose random starting point among the non-pattern cells
+    free = remaining
+    start = _random_free_cell(visited, remaining, rng)
+    visited[start] = 1
+    remaining -= 1
+
+    # Stack for DFS backtracking - holds the path we've taken
+    stack = [start]
+    choice = rng.choice
+    last_row = n - w
+
+    # DFS main loop - continue until all cells are visited
+    while remaining and stack:
+        # Current position is the top of the stack
+        cur = stack[-1]
+        col = cur % w
+        options = []
+        if cur >= w and not visited[cur - w]:
+            options.append((NORTH, SOUTH, cur - w))
+        if cur < last_row and not visited[cur + w]:
+            options.append((SOUTH, NORTH, cur + w))
+        if col < w - 1 and not visited[cur + 1]:
+            options.append((EAST, WEST, cur + 1))
+        if col > 0 and not visited[cur - 1]:
+            options.append((WEST, EAST, cur - 1))
+        if not options:
+            stack.pop()
+            continue
+
+        # choose random direction and break the wall on both sides
+        side, back, nxt = choice(options)
+        cells[cur] |= side
+        cells[nxt] |= back
+
+        # marked as visited and pushed to previous path stacks end
+        visited[nxt] = 1
+        remaining -= 1
+        stack.append(nxt)
+        yield cur, side
+
+    if instrumentation.enabled:
+        # counted afterwards: the loop stays the same when disabled
+        visited_cells = free - remaining
+        # every visited cell was pushed once, the others were popped
+        instrumentation.add("dfs.cells_visited", visited_cells)
+        instrumentation.add("dfs.backtracks", visited_cells - len(stack))
+        # the stack always holds the tree path from start to its top
+        instrumentation.maximum(
+            "dfs.peak_stack_depth", _tree_height(cells, w, start)
+        )
+
+
+@register_generator("dfs")
+def generate_dfs(grid: MazeGrid, rng: random.Random) -> None:
+    """Randomized DFS: iter_dfs run to the end"""
+    # drained in C, nothing is done per carve
+    deque(iter_dfs(grid, rng), maxlen=0)
+
+
+# mask -> 1 when the east / south wall is open
+EAST_OPEN = bytes(1 if m & EAST else 0 for m in range(256))
+SOUTH_OPEN = bytes(1 if m & SOUTH else 0 for m in range(256))
+
+
+def _finished_events(
+    name: str, grid: MazeGrid, rng: random.Random
+) -> Iterator[Event]:
+    """Run engine `name`, then yield the open walls, row by row"""
+    GENERATORS[name](grid, rng)
+    cells = bytes(grid.cells)
+    east = cells.translate(EAST_OPEN)
+    south = cells.translate(SOUTH_OPEN)
+    w = grid.width
+    for r in range(grid.height):
+        for c in range(r * w, (r + 1) * w):
+            if east[c]:
+                yield c, EAST
+            if south[c]:
+                yield c, SOUTH
+
+
+def iter_engine(
+    name: str, grid: MazeGrid, rng: random.Random
+) -> Iterator[Event]:
+    """
+    Carve events of engine `name` on grid. Engines without a stepper
+    are run to the end first, their walls then come in reading order.
+    """
+    stepper = STEPPERS.get(name)
+    if stepper is not None:
+        return stepper(grid, rng)
+    return _finished_events(name, grid, rng)
+
+
+@register_generator("kruskal")
+def generate_kruskal(grid: MazeGrid, rng: random.Random) -> None:
+    """
+    Randomized Kruskal.
+
+    Every wall between two non-pattern cells is an edge id in a flat
+    list: cell * 2 for its east wall, cell * 2 + 1 for its south wall.
+    Edges are shuffled, then a wall is opened whenever it joins two
+    different trees of a path-compressed union-find.
+    """
+    cells = grid.cells
+    w = grid.width
+    n = len(cells)
+
+    edges: List[int] = []
+    for index in range(n):
+        if cells[index] & PATTERN:
+            continue
+        if index % w < w - 1 and not cells[index + 1] & PATTERN:
+            edges.append(index * 2)
+        if index + w < n and not cells[index + w] & PATTERN:
+            edges.append(index * 2 + 1)
+    rng.shuffle(edges)
+
+    parent = list(range(n))
+    joins = n - cells.count(PATTERN) - 1
+    for edge in edges:
+        if joins <= 0:
+            break
+        a = edge >> 1
+        b = a + w if edge & 1 else a + 1
+
+        # find both roots, halving the paths on the way
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        while parent[b] != b:
+            parent[b] = parent[parent[b]]
+            b = parent[b]
+        if a == b:
+            continue
+        parent[b] = a
+        joins -= 1
+
+        a = edge >> 1
+        if edge & 1:
+            cells[a] |= SOUTH
+            cells[a + w] |= NORTH
+        else:
+            cells[a] |= EAST
+            cells[a + 1] |= WEST
+
+
+@register_generator("wilson")
+def generate_wilson(grid: MazeGrid, rng: random.Random) -> None:
+    """
+    Wilson's algorithm (loop-erased random walks).
+
+    Starting from a random cell in the tree, a random walk is run from
+    each cell not in the tree until it hits the tree. Only the last
+    exit direction of each walked cell is kept, which erases the loops,
+    and the remaining path is carved. Every spanning tree is equally
+    likely (uniform, unbiased maze).
+    """
+    cells = grid.cells
+    w = grid.width
+    n = len(cells)
+    last_row = n - w
+    offsets = {NORTH: -w, SOUTH: w, EAST: 1, WEST: -1}
+    back = {NORTH: SOUTH, SOUTH: NORTH, EAST: WEST, WEST: EAST}
+
+    # 42 pattern cells count as already in the tree: never walked on
+    in_tree = cells.translate(VISITED_TABLE)
+    free = n - in_tree.count(1)
+    if not free:
+        return
+    blocked = in_tree[:]
+    in_tree[_random_free_cell(blocked, free, rng)] = 1
+
+    walk = bytearray(n)
+    choice = rng.choice
+    for start in range(n):
+        if in_tree[start]:
+            continue
+
+        # random walk, remembering the last exit of each cell
+        cur = start
+        while not in_tree[cur]:
+            col = cur % w
+            options = []
+            if cur >= w and not blocked[cur - w]:
+                options.append(NORTH)
+            if cur < last_row and not blocked[cur + w]:
+                options.append(SOUTH)
+            if col < w - 1 and not blocked[cur + 1]:
+                options.append(EAST)
+            if col > 0 and not blocked[cur - 1]:
+                options.append(WEST)
+            side = choice(options)
+            walk[cur] = side
+            cur += offsets[side]
+
+        # carve the loop-erased path into the tree
+        cur = start
+        while not in_tree[cur]:
+            side = walk[cur]
+            nxt = cur + offsets[side]
+            cells[cur] |= side
+            cells[nxt] |= back[side]
+            in_tree[cur] = 1
+            cur = nxt
+
+
+@register_generator("eller")
+def generate_eller(grid: MazeGrid, rng: random.Random) -> None:
+    """Eller's algorithm, row by row (see mazegen.eller)"""
+    w = grid.width
+    eller = EllerGenerator(grid.height, w, rng)
+    for r, row in enumerate(eller.rows()):
+        grid.cells[r * w:(r + 1) * w] = row
+
+
+if __name__ == "__main__":
+    exit()
@@ -0,0 +1,214 @@
+"""
+Docstring for mazegen.hexfile
+
+Reading back the HEX output file, and solving it.
+
+The file is memory-mapped and the maze block is decoded in bulk: the
+newlines are dropped and every hex digit becomes its mask with one
+bytes.translate, straight into a MazeGrid. Nothing is regenerated, so
+mazes written by other programs can be solved and verified too.
+"""
+
+import mmap
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Type
+from .models import (
+    MazeGrid,
+    NORTH,
+    EAST,
+    SOUTH,
+    WEST,
+    PATTERN,
+    fits_42_pattern,
+    forty_two_coords,
+)
+from .shortest_path import BFS, Solver, path_to_directions
+
+# hex digit -> mask, anything else -> BAD_DIGIT
+BAD_DIGIT = 0xFF
+HEX_VALUES = bytes(
+    int(chr(b), 16) if chr(b) in "0123456789abcdefABCDEF" else BAD_DIGIT
+    for b in range(256)
+)
+
+MOVES = {
+    "N": (NORTH, -1, 0),
+    "E": (EAST, 0, 1),
+    "S": (SOUTH, 1, 0),
+    "W": (WEST, 0, -1),
+}
+
+
+def _parse_coords(line: bytes, name: str, file: str) -> Tuple[int, int]:
+    try:
+        r, c = line.decode("ascii").split(",")
+        return int(r), int(c)
+    except ValueError:
+        raise ValueError(f"{file}: bad {name} line {line!r}")
+
+
+class HexMaze:
+    """
+    A maze read from a HEX output file
+
+    Has height, width and maze like MazeManager (see BinaryMaze).
+    `path_line` is the N/E/S/W line as found in the file ("" if none)
+    and `path_offset` where it starts, to rewrite it in place.
+    """
+
+    def __init__(self, file: str) -> None:
+        self.file = file
+        with open(file, "rb") as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError(f"{file}: empty maze file")
+        with data:
+            self._parse(data)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, name: str = "<bytes>") -> "HexMaze":
+        """HexMaze of file content held in memory, name is for errors"""
+        hex_maze = cls.__new__(cls)
+        hex_maze.file = name
+        hex_maze._parse(data)
+        return hex_maze
+
+    def _parse(self, data: "mmap.mmap | bytes") -> None:
+        file = self.file
+        # the maze block ends at the first empty line
+        end, blank = data.find(b"\n\n"), 2
+        if end < 0:
+            end, blank = data.find(b"\n\r\n"), 3
+        if end < 0:
+            raise ValueError(f"{file}: no empty line after the maze")
+        block = data[:end].replace(b"\r", b"")
+        width = block.find(b"\n")
+        if width < 0:
+            width = len(block)
+        height = (len(block) + 1) // (width + 1)
+        if width == 0 or height * (width + 1) != len(block) + 1:
+            raise ValueError(f"{file}: maze rows are not all the same size")
+
+        cells = bytearray(block.replace(b"\n", b"").translate(HEX_VALUES))
+        if len(cells) != height * width:
+            raise ValueError(f"{file}: maze rows are not all the same size")
+        if BAD_DIGIT in cells:
+            index = cells.index(BAD_DIGIT)
+            raise ValueError(
+                f"{file}: not a hex digit at ({index // width}, "
+                f"{index % width})"
+            )
+        self.height = height
+        self.width = width
+        self.maze = MazeGrid.from_buffer(height, width, cells)
+        # flag the closed cells of the 42 back, as generation does
+        if fits_42_pattern(height, width):
+            for r, c in forty_two_coords(height, width):
+                if not cells[r * width + c]:
+                    cells[r * width + c] = PATTERN
+
+        # entry, exit, then the path line (may be missing or empty)
+        pos = end + blank
+        lines: List[bytes] = []
+        # True when the exit line is the last one, without a newline
+        self.ends_at_exit = False
+        for _ in range(2):
+            nl = data.find(b"\n", pos)
+            if nl < 0:
+                nl = len(data)
+                self.ends_at_exit = True
+            lines.append(data[pos:nl].strip())
+            pos = nl + 1
+        self.entry = _parse_coords(lines[0], "entry", file)
+        self.exit = _parse_coords(lines[1], "exit", file)
+        for r, c in (self.entry, self.exit):
+            if not (0 <= r < height and 0 <= c < width):
+                raise ValueError(f"{file}: {(r, c)} is out of the maze")
+        self.path_offset = min(pos, len(data))
+        self.path_line = data[self.path_offset:].decode("ascii").strip()
+
+    def check_path(self, moves: str) -> Optional[str]:
+        """
+        Walk `moves` from the entry: None if it reaches the exit through
+        open walls only, else what is wrong with it
+        """
+        cells = self.maze.cells
+        w = self.width
+        r, c = self.entry
+        for step, move in enumerate(moves):
+            if move not in MOVES:
+                return f"unknown move {move!r} at step {step}"
+            side, dr, dc = MOVES[move]
+            if not cells[r * w + c] & side:
+                return f"move {move} at step {step} goes through a wall"
+            r, c = r + dr, c + dc
+            if not (0 <= r < self.height and 0 <= c < w):
+                return f"move {move} at step {step} leaves the maze"
+        if (r, c) != self.exit:
+            return f"path ends at {(r, c)} instead of the exit"
+        return None
+
+
+@dataclass
+class SolveResult:
+    """Outcome of solve_file for one maze file"""
+
+    file: str
+    # "appended", "missing" (no path line, not written), "valid",
+    # "invalid" or "unsolvable"
+    status: str
+    length: Optional[int]
+    message: str = ""
+
+
+def solve_file(
+    file: str,
+    solver: Type[Solver] = BFS,
+    write: bool = True,
+) -> SolveResult:
+    """
+    Solve a HEX maze file.
+
+    With no path line, the shortest path is appended to the file; when
+    write is False it is only computed and the status is "missing".
+    With a path line, it is verified: it must go from entry to exit
+    through open walls and be as short as the solver's path (any of
+    several shortest paths is accepted).
+    """
+    hex_maze = HexMaze(file)
+    path = solver().shortest_path(
+        hex_maze.maze,
+        hex_maze.height,
+        hex_maze.width,
+        hex_maze.entry,
+        hex_maze.exit,
+    )
+    found = path_to_directions(path) if path else None
+
+    if not hex_maze.path_line:
+        if found is None:
+            return SolveResult(file, "unsolvable", None, "no path to exit")
+        if not write:
+            return SolveResult(file, "missing", len(found), "no path line")
+        with open(file, "r+b") as f:
+            f.seek(hex_maze.path_offset)
+            f.truncate()
+            if hex_maze.ends_at_exit:
+                f.write(b"\n")
+            f.write("".join(found).encode("ascii"))
+        return SolveResult(file, "appended", len(found))
+
+    moves = hex_maze.path_line
+    error = hex_maze.check_path(moves)
+    if error is None and found is None:
+        error = "the solver found no path"
+    if error is None and len(moves) != len(found):
+        error = f"{len(moves)} moves, the shortest path has {len(found)}"
+    if error is not None:
+        return SolveResult(file, "invalid", len(moves), error)
+    return SolveResult(file, "valid", len(moves))
+
+
+if __name__ == "__main__":
+    exit()
@@ -0,0 +1,172 @@
+"""
+Docstring for mazegen.instrument
+
+Opt-in instrumentation: wall time per phase, counters, and cProfile /
+tracemalloc captures around chosen phases.
+
+The package reports to the shared `instrumentation` object:
+    phases    generate, make_imperfect, close_open_areas, solve,
+              render, save_maze_file
+    counters  dfs.cells_visited, dfs.backtracks, dfs.peak_stack_depth,
+              make_imperfect.walls_opened, open_areas.walls_closed,
+              solve.nodes_expanded, save_maze_file.bytes_written
+
+Disabled (the default), a phase is a shared no-op context manager and a
+counter update a single attribute check, so nothing is measured and
+nothing is stored.
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Set
+
+# lines kept from a profile / allocation sites kept from a snapshot
+PROFILE_LINES = 25
+MEMORY_SITES = 10
+
+
+class _NoPhase:
+    """Context manager doing nothing (phases when disabled)"""
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+NO_PHASE = _NoPhase()
+
+
+class Instrumentation:
+    """
+    Phase timings and counters of the maze pipeline
+
+    enable() starts recording, report() / dump_json() give the results.
+    Phase names given to `profile` run under cProfile, and those given
+    to `trace_memory` under tracemalloc ("*" selects every phase).
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.profile: Set[str] = set()
+        self.trace_memory: Set[str] = set()
+        self._profiling = False
+        self.reset()
+
+    def enable(
+        self, profile: Iterable[str] = (), trace_memory: Iterable[str] = ()
+    ) -> None:
+        """Start recording (the results so far are kept)"""
+        self.enabled = True
+        self.profile = set(profile)
+        self.trace_memory = set(trace_memory)
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        """Forget every result"""
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.profiles: Dict[str, str] = {}
+        self.memory: Dict[str, Dict[str, Any]] = {}
+
+    def phase(self, name: str) -> Any:
+        """Context manager timing one run of the phase `name`"""
+        if not self.enabled:
+            return NO_PHASE
+        return self._phase(name)
+
+    @contextmanager
+    def _phase(self, name: str) -> Iterator[None]:
+        profiler = None
+        if not self._profiling and self._wants(self.profile, name):
+            # one profiler at a time: nested phases are in its stats
+            profiler = cProfile.Profile()
+            self._profiling = True
+        traced = self._wants(self.trace_memory, name)
+        started_tracing = traced and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if traced:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+            elapsed = time.perf_counter() - start
+
+            stats = self.phases.setdefault(
+                name, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0}
+            )
+            stats["calls"] += 1
+            stats["seconds"] += elapsed
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+
+            if profiler is not None:
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats(
+                    "cumulative"
+                ).print_stats(PROFILE_LINES)
+                self.profiles[name] = out.getvalue()
+            if traced:
+                current, peak = tracemalloc.get_traced_memory()
+                sites = tracemalloc.take_snapshot().statistics("lineno")
+                self.memory[name] = {
+                    "peak_bytes": peak - before,
+                    "retained_bytes": current - before,
+                    "top_sites": [
+                        str(site) for site in sites[:MEMORY_SITES]
+                    ],
+                }
+            if started_tracing:
+                tracemalloc.stop()
+
+    @staticmethod
+    def _wants(names: Set[str], name: str) -> bool:
+        return name in names or "*" in names
+
+    def add(self, counter: str, value: int = 1) -> None:
+        """Add value to a counter"""
+        if self.enabled:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def maximum(self, counter: str, value: int) -> None:
+        """Keep the biggest value seen by a counter"""
+        if self.enabled:
+            self.counters[counter] = max(self.counters.get(counter, 0), value)
+
+    def report(self) -> Dict[str, Any]:
+        """Every result as JSON serializable data"""
+        return {
+            "phases": self.phases,
+            "counters": self.counters,
+            "profiles": self.profiles,
+            "memory": self.memory,
+        }
+
+    def dump_json(self, file: str) -> None:
+        with open(file, "w") as f:
+            json.dump(self.report(), f, indent=2, sort_keys=True)
+            f.write("\n")
+
+
+# the instance the package reports to
+instrumentation = Instrumentation()
+
+
+if __name__ == "__main__":
+    exit()
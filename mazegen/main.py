@@ -3,9 +3,35 @@ Docstring for mazegen.main
 """
 
 import random
-from typing import Tuple, List, Dict, Any
-from .models import MazeCell
+import time
+from typing import Iterator, Tuple, List, Any
+from .areas import close_open_areas
+from .generators import GENERATORS, Event, iter_engine
+from .models import (
+    MazeCell,
+    MazeGrid,
+    NORTH,
+    EAST,
+    SOUTH,
+    WEST,
+    WALLS,
+    PATTERN,
+    fits_42_pattern,
+    forty_two_coords,
+)
 from .render import MazeRender
+from .shortest_path import SOLVERS, DistanceField
+from .writer import OutputWriter
+from .hexfile import HexMaze
+from .instrument import instrumentation
+
+# mask -> 1 for dead-ends (a single open side) outside the 42 pattern
+DEAD_END_TABLE = bytes(
+    1 if not m & PATTERN and bin(m & WALLS).count("1") == 1 else 0
+    for m in range(256)
+)
+# byte -> 1 when not zero
+CHANGED_TABLE = bytes(1 if m else 0 for m in range(256))
 
 
 class MazeManager:
@@ -66,6 +92,25 @@ class MazeManager:
                 "EXIT must be a tuple of two integers (row, col), got "
                 f"{exit_!r}"
             )
+        loop_density = config.get("LOOP_DENSITY", 0.35)
+        if not isinstance(loop_density, (int, float)) or not (
+            0 <= loop_density <= 1
+        ):
+            raise ValueError(
+                "LOOP_DENSITY must be a number in [0, 1], got "
+                f"{loop_density!r}"
+            )
+        algorithm = config.get("ALGORITHM", "dfs")
+        if algorithm not in GENERATORS:
+            raise ValueError(
+                f"ALGORITHM must be one of {', '.join(GENERATORS)}, got "
+                f"{algorithm!r}"
+            )
+        solver = config.get("SOLVER", "bfs")
+        if solver not in SOLVERS:
+            raise ValueError(
+                f"SOLVER must be one of {', '.join(SOLVERS)}, got {solver!r}"
+            )
         # Assign validated configuration
         self.height: int = height
         self.width: int = width
@@ -75,8 +120,16 @@ class MazeManager:
         self.entry: Tuple[int, int] = entry
         self.exit: Tuple[int, int] = exit_
         self.color: str = config["COLOR"]
+        self.algorithm: str = algorithm
+        self.loop_density: float = loop_density
+        self.solver: str = solver
 
-        self.rng = random.Random()
+        # Seeded once: successive generations follow the SEED sequence
+        self.rng = random.Random(seed)
+        # Seconds spent in the engine by the last generation
+        self.generation_time: float = 0.0
+        # ... and in make_imperfect + the 3x3 open area fix
+        self.imperfect_time: float = 0.0
 
         # 42 pattern coords (may be empty if maze too small)
         self.pattern_coordinates: List[Tuple[int, int]] = (
@@ -85,13 +138,25 @@ class MazeManager:
             else []
         )
 
-        self.maze: List[List[MazeCell]] = self.get_maze_container()
-        self._cell_map: Dict[Tuple[int, int], MazeCell] = (
-            self._create_cell_map()
+        self.maze: MazeGrid = self.get_maze_container()
+
+        # kept between prints: it caches the drawing of the maze
+        self.renderer = MazeRender(
+            o_file=self.o_file,
+            entry=self.entry,
+            exit=self.exit,
+            color=self.color,
         )
 
+        # background thread writing OUTPUT_FILE, started on first use
+        self.writer: OutputWriter | None = None
+
+        # exit distance field and the (grid, version) it was built for
+        self._exit_field: DistanceField | None = None
+        self._exit_field_key: Tuple[MazeGrid, int] | None = None
+
     def check_42_pattern_availability(self) -> bool:
-        if int(self.width) >= 14 and int(self.height) >= 10:
+        if fits_42_pattern(self.height, self.width):
             return True
         print("The maze size too small, 42 pattern omitted!")
         return False
@@ -102,274 +167,267 @@ class MazeManager:
         Pattern is centered in the maze.
         """
 
-        coords: List[Tuple[int, int]] = []
-        r, c = (int((self.height - 5) / 2)), int((self.width - 7) / 2)
-
-        # "4" part
-        coords.append((r, c))
-        coords.append((r + 1, c))
-        coords.append((r + 2, c))
-        coords.append((r + 2, c + 1))
-        coords.append((r + 2, c + 2))
-        coords.append((r + 3, c + 2))
-        coords.append((r + 4, c + 2))
-
-        # "2" part
-        coords.append((r, c + 4))
-        coords.append((r + 2, c + 4))
-        coords.append((r + 3, c + 4))
-        coords.append((r + 4, c + 4))
-        coords.append((r, c + 5))
-        coords.append((r + 2, c + 5))
-        coords.append((r + 4, c + 5))
-        coords.append((r, c + 6))
-        coords.append((r + 1, c + 6))
-        coords.append((r + 2, c + 6))
-        coords.append((r + 4, c + 6))
-
-        return coords
-
-    def get_maze_container(self) -> List[List[MazeCell]]:
-        """Initializes the grid with closed cells."""
+        return forty_two_coords(self.height, self.width)
 
-        container = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                if tuple([i, j]) in self.pattern_coordinates:
-                    row.append(
-                        MazeCell(
-                            False,
-                            False,
-                            False,
-                            False,
-                            True,
-                            (i, j),
-                        )
-                    )
-                else:
-                    row.append(
-                        MazeCell(
-                            False,
-                            False,
-                            False,
-                            False,
-                            False,
-                            (i, j),
-                        )
-                    )
-            container.append(row)
-
-        return container
-
-    def _create_cell_map(self) -> Dict[Tuple[int, int], MazeCell]:
-        """
-        Create a coordinate-to-cell mapping for fast lookup.
-        Returns:Dictionary mapping (row, col) tuples to MazeCell objects
-        """
+    def get_maze_container(self) -> MazeGrid:
+        """Initializes the grid with closed cells."""
 
-        cell_map = {}
-        for i in range(self.height):
-            for j in range(self.width):
-                cell = self.maze[i][j]
-                cell_map[cell.coordinates] = cell
-        return cell_map
+        return MazeGrid(self.height, self.width, self.pattern_coordinates)
 
     def get_maze_cell_from_coordinate(
         self, coordinate: Tuple[int, int]
     ) -> MazeCell:
         """Retrieve a MazeCell object using its coordinates."""
 
-        try:
-            return self._cell_map[coordinate]
-        except KeyError:
+        r, c = coordinate
+        if not (0 <= r < self.height and 0 <= c < self.width):
             raise ValueError(f"{coordinate} does not exist")
+        return self.maze.cell(r, c)
 
     def get_all_coords(self) -> List[tuple[int, int]]:
-        coords = []
-        for row in self.maze:
-            for cell in row:
-                coords.append(cell.coordinates)
-        return coords
+        return [
+            (r, c) for r in range(self.height) for c in range(self.width)
+        ]
 
-    def get_neighbor_cells(
-        self, current_cell: MazeCell, available: list[tuple[int, int]]
-    ) -> Dict[str, MazeCell]:
-        """Find neighboring cells that are available (not visited yet).
+    def make_imperfect(self, density: float | None = None) -> None:
+        """
+        Add extra openings to create loops (non-perfect maze)
+        Note: it does not guarantee another well-looped path
 
         Args:
-            current_cell: The cell whose neighbors to check
-            available: List of coordinates that haven't been visited yet
+            density: share of the dead-ends that get one more wall
+                opened, defaults to the LOOP_DENSITY config key.
+                Each opening adds exactly one loop.
 
-        Returns:
-            Dictionary mapping direction strings ("north", ..., "west")
-            to MazeCell objects that are unvisited neighbors
+        Dead-ends are found in one pass over the masks, then a seeded
+        sample of them is opened: the result only depends on SEED.
         """
-        ava_neighbors: Dict[str, MazeCell] = {}
-        r, c = current_cell.coordinates
-        north = (r - 1, c)
-        south = (r + 1, c)
-        east = (r, c + 1)
-        west = (r, c - 1)
-
-        if north in available:
-            ava_neighbors["north"] = self.get_maze_cell_from_coordinate(north)
-        if south in available:
-            ava_neighbors["south"] = self.get_maze_cell_from_coordinate(south)
-        if east in available:
-            ava_neighbors["east"] = self.get_maze_cell_from_coordinate(east)
-        if west in available:
-            ava_neighbors["west"] = self.get_maze_cell_from_coordinate(west)
-        return ava_neighbors
-
-    def make_imperfect(self) -> None:
+        if density is None:
+            density = self.loop_density
+        cells = self.maze.cells
+        w = self.width
+        n = len(cells)
+
+        # Only target dead-ends (3 blocked walls, never the 42)
+        # to keep changes small and controlled.
+        dead_ends: List[int] = []
+        flags = cells.translate(DEAD_END_TABLE)
+        index = flags.find(1)
+        while index != -1:
+            dead_ends.append(index)
+            index = flags.find(1, index + 1)
+
+        count = round(density * len(dead_ends))
+        opened = 0
+        for index in sorted(self.rng.sample(dead_ends, count)):
+            mask = cells[index]
+            col = index % w
+
+            # walls that can be broken: closed, not the outside border
+            # and not shared with a 42 cell (both sides stay closed)
+            walls = []
+            if index >= w and not mask & NORTH:
+                walls.append((NORTH, SOUTH, index - w))
+            if index + w < n and not mask & SOUTH:
+                walls.append((SOUTH, NORTH, index + w))
+            if col < w - 1 and not mask & EAST:
+                walls.append((EAST, WEST, index + 1))
+            if col > 0 and not mask & WEST:
+                walls.append((WEST, EAST, index - 1))
+            walls = [wall for wall in walls if not cells[wall[2]] & PATTERN]
+            if not walls:
+                continue
+
+            side, back, neighbor = self.rng.choice(walls)
+            cells[index] |= side
+            cells[neighbor] |= back
+            opened += 1
+        self.maze.touch()
+        instrumentation.add("make_imperfect.walls_opened", opened)
+
+    def generate(
+        self, algorithm: str | None = None, seed: int | None = None
+    ) -> MazeGrid:
         """
-        Add extra openings to create loops (non-perfect maze)
-        Note: it does not guarantee another well-looped path
+        Generate a new maze with one of the GENERATORS engines.
+
+        Args:
+            algorithm: engine name, defaults to the ALGORITHM config key
+            seed: reseed the random generator first when given
+
+        The time spent in the engine is kept in self.generation_time,
+        the time spent adding loops (PERFECT=False) in self.imperfect_time.
         """
-        threshold = 0.35
-
-        for row in self.maze:
-            for cell in row:
-                # jump over coordinates in 42 pattern
-                if cell.coordinates in self.pattern_coordinates:
-                    continue
-                r, c = cell.coordinates
-
-                # walls show the blocked side(s) of a cell
-                walls = []
-                if not cell.north:
-                    walls.append("north")
-                if not cell.south:
-                    walls.append("south")
-                if not cell.east:
-                    walls.append("east")
-                if not cell.west:
-                    walls.append("west")
-
-                # Only target dead-ends (3 blocked walls)
-                # to keep changes small and controlled.
-                if len(walls) != 3:
-                    continue
-
-                # remove candidate wall directions that point outside the maze
-                if r == 0 and "north" in walls:
-                    # r == 0 is the rule to avoid breaking
-                    # the outside north border wall
-                    # "north" in walls for remove() to avoid reporting an error
-                    walls.remove("north")
-                if c == 0 and "west" in walls:
-                    walls.remove("west")
-                    # height = row number of coordinates
-                    # width = cell/column number of coordinates
-                    # r: 0..height-1 (row index)
-                    # c: 0..width-1  (col index)
-                if r == self.height - 1 and "south" in walls:
-                    walls.remove("south")
-                if c == self.width - 1 and "east" in walls:
-                    walls.remove("east")
-
-                # remove 42-pattern-nearby cell directions that point to 42
-                # ensure 42 border block and cells one step back nearby
-                # have the same blocked status
-                # for the shared wall
-
-                if (r - 1, c) in self.pattern_coordinates and "north" in walls:
-                    walls.remove("north")
-                if (r + 1, c) in self.pattern_coordinates and "south" in walls:
-                    walls.remove("south")
-                if (r, c - 1) in self.pattern_coordinates and "west" in walls:
-                    walls.remove("west")
-                if (r, c + 1) in self.pattern_coordinates and "east" in walls:
-                    walls.remove("east")
-
-                if not walls:
-                    continue
-
-                if self.rng.random() > threshold:
-                    continue
-
-                choice = self.rng.choice(walls)
-
-                if choice == "north":
-                    cell.north = True
-                    self.get_maze_cell_from_coordinate((r - 1, c)).south = True
-                elif choice == "south":
-                    cell.south = True
-                    self.get_maze_cell_from_coordinate((r + 1, c)).north = True
-                elif choice == "east":
-                    cell.east = True
-                    self.get_maze_cell_from_coordinate((r, c + 1)).west = True
-                elif choice == "west":
-                    cell.west = True
-                    self.get_maze_cell_from_coordinate((r, c - 1)).east = True
-
-    def generate_maze_dfs(self, seed: int = None) -> List[List[MazeCell]]:
+        if algorithm is None:
+            algorithm = self.algorithm
+        try:
+            engine = GENERATORS[algorithm]
+        except KeyError:
+            raise ValueError(f"Unknown generation algorithm {algorithm!r}")
         if seed is not None:
             self.rng.seed(seed)
-        # All cells start as unvisited
-        available = self.get_all_coords()
-
-        # remove 42 pattern from DFS available list[tuples]
-        for coord in self.pattern_coordinates:
-            if coord in available:
-                available.remove(coord)
-
-        if not available:
-            return self.maze
-
-        # Choose random starting point
-        start_coord = self.rng.choice(available)
-        available.remove(start_coord)
-
-        # Stack for DFS backtracking - holds the path we've taken
-        stack = [start_coord]
-
-        # DFS main loop - continue until all cells are visited
-        while available:
-            # Current position is the top of the stack
-            current_coord = stack[-1]
-            current_cell = self.get_maze_cell_from_coordinate(current_coord)
-            ava_neighbors = self.get_neighbor_cells(current_cell, available)
-            if not ava_neighbors:
-                stack.pop()
-                continue
 
-            # choose random direction
-            direction = self.rng.choice(list(ava_neighbors.keys()))
-            neighbor_cell = ava_neighbors[direction]
-
-            # break the wall
-            if direction == "north":
-                current_cell.north = True
-                neighbor_cell.south = True
-            elif direction == "south":
-                current_cell.south = True
-                neighbor_cell.north = True
-            elif direction == "east":
-                current_cell.east = True
-                neighbor_cell.west = True
-            else:
-                current_cell.west = True
-                neighbor_cell.east = True
-
-            # marked as visited
-            available.remove(neighbor_cell.coordinates)
-            # pushed to previous path stacks end
-            stack.append(neighbor_cell.coordinates)
+        self.maze = self.get_maze_container()
+        start = time.perf_counter()
+        with instrumentation.phase("generate"):
+            engine(self.maze, self.rng)
+        self.generation_time = time.perf_counter() - start
 
+        start = time.perf_counter()
         if not self.perfect:
-            self.make_imperfect()
+            with instrumentation.phase("make_imperfect"):
+                self.make_imperfect()
+            # only loops can make 3x3 open areas: fixed in place
+            with instrumentation.phase("close_open_areas"):
+                closed = close_open_areas(self.maze)
+            instrumentation.add("open_areas.walls_closed", closed)
+        self.imperfect_time = time.perf_counter() - start
         return self.maze
 
-    def print_maze(self, path: List[Tuple[int, int]]) -> None:
+    def iter_generate(
+        self, algorithm: str | None = None, seed: int | None = None
+    ) -> Iterator[Event]:
         """
-        Use the render to print the maze
+        Generate a new maze like generate(), step by step: the returned
+        iterator carves self.maze and yields a (cell, side) event after
+        each wall it opens (cell is a flat index, row * width + col).
+
+        self.maze is the new, fully closed grid as soon as this returns,
+        so a consumer can draw it before the first event. Running the
+        iterator to the end gives the maze generate() gives.
+
+        With PERFECT=False the loops come last, once carving is done;
+        a wall closed again by the 3x3 rule comes as (cell, -side).
         """
-        renderer = MazeRender(
-            o_file=self.o_file, entry=self.entry, exit=self.exit, color=self.color
+        if algorithm is None:
+            algorithm = self.algorithm
+        if algorithm not in GENERATORS:
+            raise ValueError(f"Unknown generation algorithm {algorithm!r}")
+        if seed is not None:
+            self.rng.seed(seed)
+        self.maze = self.get_maze_container()
+        return self._events(algorithm)
+
+    def _events(self, algorithm: str) -> Iterator[Event]:
+        # engine time only: the consumer runs between two events
+        clock = time.perf_counter
+        elapsed = 0.0
+        start = clock()
+        for event in iter_engine(algorithm, self.maze, self.rng):
+            elapsed += clock() - start
+            yield event
+            start = clock()
+        self.generation_time = elapsed + clock() - start
+        self.maze.touch()
+        if self.perfect:
+            return
+
+        cells = self.maze.cells
+        carved = bytes(cells)
+        start = time.perf_counter()
+        self.make_imperfect()
+        close_open_areas(self.maze)
+        self.imperfect_time = time.perf_counter() - start
+
+        # cells changed by the loops: xor of the grids as big integers
+        n = len(cells)
+        diff = int.from_bytes(cells, "little") ^ int.from_bytes(
+            carved, "little"
         )
-        myprintmaze = renderer.render(self, path)
+        changed = diff.to_bytes(n, "little").translate(CHANGED_TABLE)
+        index = changed.find(1)
+        while index != -1:
+            opened = cells[index] & ~carved[index]
+            closed = carved[index] & ~cells[index]
+            for side in (EAST, SOUTH):
+                if opened & side:
+                    yield index, side
+                elif closed & side:
+                    yield index, -side
+            index = changed.find(1, index + 1)
+
+    def generate_maze_dfs(self, seed: int = None) -> MazeGrid:
+        """Generate a new maze with the DFS engine"""
+        return self.generate("dfs", seed)
+
+    def exit_field(self) -> DistanceField:
+        """
+        Distances and next moves toward EXIT for every cell.
+
+        Computed once per maze with a reverse BFS and cached until the
+        walls change (new generation or new grid version).
+        """
+        key = (self.maze, self.maze.version)
+        cached = self._exit_field_key
+        if (
+            self._exit_field is None
+            or cached is None
+            or cached[0] is not key[0]
+            or cached[1] != key[1]
+        ):
+            self._exit_field = DistanceField(
+                self.maze, self.height, self.width, self.exit
+            )
+            self._exit_field_key = key
+        return self._exit_field
+
+    def save_maze_file(
+        self,
+        path: List[Tuple[int, int]] | None,
+        background: bool = True,
+    ) -> None:
+        """
+        Write the current maze and its path to OUTPUT_FILE.
+
+        Meant to run once per generated maze. With background=True the
+        file is written by the OutputWriter thread and this returns at
+        once; call close_output() before leaving to be sure it is on disk.
+        """
+        if path is None:
+            path = []
+        if not background:
+            self.renderer.save_maze_file(self.maze, path)
+            return
+        if self.writer is None:
+            self.writer = OutputWriter(self.renderer)
+        self.writer.submit(self.maze, path)
+
+    def load_maze_file(self, file: str | None = None) -> HexMaze:
+        """
+        Replace the grid by the maze of a HEX output file (OUTPUT_FILE by
+        default) without generating anything. The file must have the
+        size of this maze; its entry, exit and path line are returned
+        with it in the HexMaze.
+        """
+        hex_maze = HexMaze(file if file is not None else self.o_file)
+        if (hex_maze.height, hex_maze.width) != (self.height, self.width):
+            raise ValueError(
+                f"{hex_maze.file} holds a {hex_maze.height}x"
+                f"{hex_maze.width} maze, expected {self.height}x{self.width}"
+            )
+        self.maze = hex_maze.maze
+        return hex_maze
+
+    def close_output(self) -> None:
+        """Wait for the pending output file writes and stop the writer"""
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def print_maze(
+        self,
+        path: List[Tuple[int, int]],
+        viewport: Tuple[int, int, int, int] | None = None,
+    ) -> None:
+        """
+        Use the render to print the maze, or only a window of it with
+        viewport = (top, left, rows, cols) in maze cells
+        """
+        self.renderer.color = self.color
+        if viewport is None:
+            myprintmaze = self.renderer.render(self, path)
+        else:
+            myprintmaze = self.renderer.render_viewport(self, path, *viewport)
         print(myprintmaze)
 
 
@@ -385,11 +443,10 @@ if __name__ == "__main__":
 # Wall consistency (N / E / S / W)
 # 42 pattern handled
 # BFS shortest path algorithm works
-# [TO DO]
-# !!! Output file
+# Output file
 # 2.1 Hex wall encoding
 # 2.2 Write maze grid to OUTPUT_FILE
 # 2.3 Append ENTRY, EXIT, shortest path (N/E/S/W)
-# !!! 3×3 open area rule
-# 3.1 Detect 3×3 open areas
-# 3.2 Regenerate maze if invalid
+# 3×3 open area rule
+# 3.1 Detect 3×3 open areas (mazegen.areas, row bitsets)
+# 3.2 Close one wall per open area in place (no regeneration)
@@ -1,17 +1,221 @@
-from dataclasses import dataclass
-from typing import Tuple
+from typing import Any, Iterable, Iterator, List, Tuple
+
+# Bits of a cell mask. A wall bit is set when that side is OPEN,
+# which is also the value written in the hex output file.
+NORTH = 1
+EAST = 2
+SOUTH = 4
+WEST = 8
+WALLS = NORTH | EAST | SOUTH | WEST
+PATTERN = 16
+
+OPPOSITE = {NORTH: SOUTH, SOUTH: NORTH, EAST: WEST, WEST: EAST}
+
+# mask -> hex digit of its 4 wall bits, usable with bytes.translate()
+HEX_DIGITS = bytes(b"0123456789abcdef"[m & WALLS] for m in range(256))
+
+
+def fits_42_pattern(height: int, width: int) -> bool:
+    """Tell if a height x width maze is big enough to draw the 42"""
+    return width >= 14 and height >= 10
+
+
+def forty_two_coords(height: int, width: int) -> List[Tuple[int, int]]:
+    """
+    Returns coordinates that draw a visible 42 using fully closed cells.
+    Pattern is centered in a height x width maze.
+    """
+
+    coords: List[Tuple[int, int]] = []
+    r, c = (int((height - 5) / 2)), int((width - 7) / 2)
+
+    # "4" part
+    coords.append((r, c))
+    coords.append((r + 1, c))
+    coords.append((r + 2, c))
+    coords.append((r + 2, c + 1))
+    coords.append((r + 2, c + 2))
+    coords.append((r + 3, c + 2))
+    coords.append((r + 4, c + 2))
+
+    # "2" part
+    coords.append((r, c + 4))
+    coords.append((r + 2, c + 4))
+    coords.append((r + 3, c + 4))
+    coords.append((r + 4, c + 4))
+    coords.append((r, c + 5))
+    coords.append((r + 2, c + 5))
+    coords.append((r + 4, c + 5))
+    coords.append((r, c + 6))
+    coords.append((r + 1, c + 6))
+    coords.append((r + 2, c + 6))
+    coords.append((r + 4, c + 6))
+
+    return coords
+
+
+def _mask_property(bit: int, doc: str) -> property:
+    """Build a bool property reading / writing one bit of the cell mask"""
+
+    def getter(self: "MazeCell") -> bool:
+        return bool(self._grid.cells[self._index] & bit)
+
+    def setter(self: "MazeCell", value: bool) -> None:
+        if value:
+            self._grid.cells[self._index] |= bit
+        else:
+            self._grid.cells[self._index] &= ~bit & 0xFF
+        self._grid.touch()
+
+    return property(getter, setter, doc=doc)
 
 
-@dataclass
 class MazeCell:
-    """Represents a single cell in the maze"""
-
-    north: bool
-    south: bool
-    east: bool
-    west: bool
-    forty_two_pattern: bool
-    coordinates: Tuple[int, int]
+    """Represents a single cell in the maze
+
+    The cell does not own any data: it is a view on one byte of a
+    MazeGrid, so creating one is cheap and writes go to the grid.
+    """
+
+    __slots__ = ("_grid", "_index", "coordinates")
+
+    def __init__(self, grid: "MazeGrid", coordinates: Tuple[int, int]) -> None:
+        self._grid = grid
+        self._index = coordinates[0] * grid.width + coordinates[1]
+        self.coordinates = coordinates
+
+    north = _mask_property(NORTH, "North side is open")
+    east = _mask_property(EAST, "East side is open")
+    south = _mask_property(SOUTH, "South side is open")
+    west = _mask_property(WEST, "West side is open")
+    forty_two_pattern = _mask_property(PATTERN, "Cell is part of the 42")
+
+    @property
+    def mask(self) -> int:
+        return self._grid.cells[self._index]
+
+    def __repr__(self) -> str:
+        return (
+            f"MazeCell(north={self.north}, south={self.south}, "
+            f"east={self.east}, west={self.west}, "
+            f"forty_two_pattern={self.forty_two_pattern}, "
+            f"coordinates={self.coordinates})"
+        )
+
+
+class MazeRow:
+    """View on one row of a MazeGrid, indexable like a list of cells"""
+
+    __slots__ = ("_grid", "_row")
+
+    def __init__(self, grid: "MazeGrid", row: int) -> None:
+        self._grid = grid
+        self._row = row
+
+    def __len__(self) -> int:
+        return self._grid.width
+
+    def __getitem__(self, col: int) -> MazeCell:
+        if col < 0:
+            col += self._grid.width
+        if not 0 <= col < self._grid.width:
+            raise IndexError("maze column out of range")
+        return MazeCell(self._grid, (self._row, col))
+
+    def __iter__(self) -> Iterator[MazeCell]:
+        for col in range(self._grid.width):
+            yield MazeCell(self._grid, (self._row, col))
+
+
+class MazeGrid:
+    """
+    Packed maze storage
+
+    One byte per cell, row-major, in a flat bytearray (`cells`):
+    the low 4 bits are the open sides (NORTH, EAST, SOUTH, WEST)
+    and PATTERN flags the closed cells drawing the 42.
+    grid[r][c] still returns a MazeCell for code walking the maze
+    cell by cell.
+    `version` changes whenever walls change through the grid API
+    (code writing `cells` directly calls touch()), so anything computed
+    from the walls can be cached per version.
+    """
+
+    def __init__(
+        self,
+        height: int,
+        width: int,
+        pattern_coordinates: Iterable[Tuple[int, int]] = (),
+    ) -> None:
+        self.height = height
+        self.width = width
+        self.cells = bytearray(height * width)
+        for r, c in pattern_coordinates:
+            self.cells[r * width + c] = PATTERN
+        self.version = 0
+
+    @classmethod
+    def from_buffer(cls, height: int, width: int, cells: Any) -> "MazeGrid":
+        """
+        Grid over existing masks without copying them (e.g. a memoryview
+        of a memory-mapped file). A read-only buffer gives a read-only
+        grid: fine for solving and rendering, not for generating.
+        """
+        if len(cells) != height * width:
+            raise ValueError("buffer size does not match the maze size")
+        grid = cls.__new__(cls)
+        grid.height = height
+        grid.width = width
+        grid.cells = cells
+        grid.version = 0
+        return grid
+
+    def __len__(self) -> int:
+        return self.height
+
+    def __getitem__(self, row: int) -> MazeRow:
+        if row < 0:
+            row += self.height
+        if not 0 <= row < self.height:
+            raise IndexError("maze row out of range")
+        return MazeRow(self, row)
+
+    def __iter__(self) -> Iterator[MazeRow]:
+        for row in range(self.height):
+            yield MazeRow(self, row)
+
+    def touch(self) -> None:
+        """Mark the walls as changed (invalidates cached results)"""
+        self.version += 1
+
+    def cell(self, row: int, col: int) -> MazeCell:
+        """Return a view on the cell at (row, col)"""
+        return MazeCell(self, (row, col))
+
+    def mask(self, row: int, col: int) -> int:
+        """Return the raw mask of the cell at (row, col)"""
+        return self.cells[row * self.width + col]
+
+    def row_masks(self, row: int) -> bytearray:
+        """Return a copy of the masks of one row"""
+        start = row * self.width
+        return bytearray(memoryview(self.cells)[start:start + self.width])
+
+    def open_wall(self, row: int, col: int, direction: int) -> None:
+        """Open the wall on `direction` side of (row, col) on both cells"""
+        w = self.width
+        index = row * w + col
+        if direction == NORTH:
+            neighbor = index - w
+        elif direction == SOUTH:
+            neighbor = index + w
+        elif direction == EAST:
+            neighbor = index + 1
+        else:
+            neighbor = index - 1
+        self.cells[index] |= direction
+        self.cells[neighbor] |= OPPOSITE[direction]
+        self.touch()
 
 
 if __name__ == "__main__":
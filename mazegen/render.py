@@ -3,8 +3,23 @@ Print the maze
 
 """
 
-from typing import TextIO, Protocol, Tuple, List
-from .models import MazeCell
+import os
+import tempfile
+import time
+from bisect import bisect_left
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    TextIO,
+    Protocol,
+    Sequence,
+    Tuple,
+    List,
+)
+from .instrument import instrumentation
+from .models import MazeGrid, HEX_DIGITS, NORTH, EAST, SOUTH, WEST
 from .shortest_path import path_to_directions
 
 
@@ -15,7 +30,7 @@ class MazeManagerProtocol(Protocol):
 
     height: int
     width: int
-    maze: list[list[MazeCell]]
+    maze: MazeGrid
 
 
 class MazeRender:
@@ -63,72 +78,162 @@ class MazeRender:
         self.canevas_w = 0
         self.color = color
         self.o_file = o_file
+        # lines of the last drawn maze, its grid and (version, entry, exit)
+        self._frame: List[str] = []
+        self._frame_maze: MazeGrid | None = None
+        self._frame_state: Tuple[Any, ...] = ()
+        # path last drawn in a viewport and its columns by row
+        self._path: Any = None
+        self._path_rows: Dict[int, List[int]] = {}
+
+    def _get_canevas_row(
+        self,
+        cells: Sequence[int],
+        h: int,
+        w: int,
+        k: int,
+        c0: int = 0,
+        c1: int | None = None,
+    ) -> bytearray:
+        """
+        Docstring for _get_canevas_row
 
-    def _get_canevas(self, h: int, w: int) -> list[list[bool]]:
+        Line k of the (2h+1) x (2w+1) canvas: 1 for a wall, 0 for open.
+        Odd lines go through the cells of maze row (k - 1) // 2, even
+        lines are the walls between two maze rows.
+        Only maze columns c0 to c1 - 1 are read: the line holds canvas
+        columns 2 * c0 to 2 * c1.
         """
-        Docstring for _get_canva
+        if c1 is None:
+            c1 = w
+        line = bytearray(b"\x01") * ((c1 - c0) * 2 + 1)
+        r = k // 2
+        if k % 2:
+            start = r * w
+            for c in range(c0, c1):
+                mask = cells[start + c]
+                caneva_c = ((c - c0) * 2) + 1
+                line[caneva_c] = 0
+                if mask & WEST:
+                    line[caneva_c - 1] = 0
+                if mask & EAST:
+                    line[caneva_c + 1] = 0
+        else:
+            below = r * w
+            above = below - w
+            for c in range(c0, c1):
+                if (r < h and cells[below + c] & NORTH) or (
+                    r > 0 and cells[above + c] & SOUTH
+                ):
+                    line[((c - c0) * 2) + 1] = 0
+        return line
+
+    def iter_lines(
+        self,
+        generated_maze: MazeManagerProtocol,
+        path: Iterable[Tuple[int, int]] = (),
+        rows: Tuple[int, int] | None = None,
+        cols: Tuple[int, int] | None = None,
+    ) -> Iterator[str]:
         """
-        c_h = self.canevas_h
-        c_w = self.canevas_w
+        Docstring for iter_lines
 
-        canevas = [[True for _ in range(c_w)] for _ in range(c_h)]
+        Yield the drawing of the maze line by line (no colors).
+        Only three canvas lines are alive at a time, so memory is
+        O(width) and the output can be streamed to a terminal or a file.
 
-        for r in range(h):
-            for c in range(w):
-                cell = self.maze[r][c]
+        rows / cols: (first, end) maze rows / columns to draw, all of
+        them by default. Only that window of the drawing is computed,
+        with the glyphs it has in the whole drawing.
+        """
+        cells = generated_maze.maze.cells
+        h = generated_maze.height
+        w = generated_maze.width
+        r0, r1 = rows if rows is not None else (0, h)
+        c0, c1 = cols if cols is not None else (0, w)
+        # one more maze column on each side: the glyphs at the window
+        # edges depend on the walls just outside of it
+        m0 = max(0, c0 - 1)
+        m1 = min(w, c1 + 1)
+        first = (c0 - m0) * 2
+        last = first + (c1 - c0) * 2
+        c_h = (h * 2) + 1
+        c_w = ((m1 - m0) * 2) + 1
+        on_path = {r * w + c for r, c in path}
+        entry = self.entry[0] * w + self.entry[1]
+        exit_ = self.exit[0] * w + self.exit[1]
+        wall_chars = self.WALL_CHARS
+
+        def canvas_row(k: int) -> bytearray:
+            if 0 <= k < c_h:
+                return self._get_canevas_row(cells, h, w, k, m0, m1)
+            return bytearray(c_w)
+
+        prev = canvas_row(r0 * 2 - 1)
+        cur = canvas_row(r0 * 2)
+        for r in range(r0 * 2, r1 * 2 + 1):
+            nxt = canvas_row(r + 1)
+
+            chars: List[str] = []
+            for c in range(first, last + 1):
+
+                if cur[c]:
+                    e = c < c_w - 1 and cur[c + 1]
+                    char = wall_chars.get(
+                        (prev[c], int(e), nxt[c], int(c > 0 and cur[c - 1])),
+                        "┼",
+                    )
+                    chars.append(char + ("─" if e else " "))
+                else:
+                    content = " "
+                    # Center of element
+                    if r % 2 != 0 and c % 2 != 0:
+                        # Coords in original mze
+                        index = ((r - 1) // 2) * w + m0 + (c - 1) // 2
+                        if index == entry:
+                            content = "S"
 
-                caneva_r = (r * 2) + 1
-                caneva_c = (c * 2) + 1
+                        elif index == exit_:
+                            content = "E"
 
-                canevas[caneva_r][caneva_c] = False
+                        # add shortest path
+                        elif index in on_path:
+                            content = "·"
 
-                if cell.north:
-                    canevas[caneva_r - 1][caneva_c] = False
-                if cell.south:
-                    canevas[caneva_r + 1][caneva_c] = False
-                if cell.east:
-                    canevas[caneva_r][caneva_c + 1] = False
-                if cell.west:
-                    canevas[caneva_r][caneva_c - 1] = False
+                    chars.append(content + " ")
+            yield "".join(chars)
 
-        return canevas
+            prev, cur = cur, nxt
 
-    def _write_maze_file(self, f: TextIO):
+    def write_lines(
+        self,
+        generated_maze: MazeManagerProtocol,
+        path: Iterable[Tuple[int, int]],
+        f: TextIO,
+    ) -> None:
         """
-        Docstring for _write_maze_file
+        Docstring for write_lines
 
-        Write the maze cells values in HEX format
+        Stream the colored drawing of the maze to f, line by line
         """
+        color = self.COLORS[self.color]
+        reset = self.COLORS["RESET"]
+        for line in self.iter_lines(generated_maze, path):
+            f.write(color + line + "\n" + reset)
 
-        final_content: List[str] = []
-
-        for line in self.maze:
-            line_str = ""
-            for cell in line:
-
-                # 1 = 0001 in binary
-                # 2 = 0010 in binary
-                # 4 = 0100 in binary
-                # 8 = 1000 in binary
-
-                value = 0
-                if cell.north:
-                    value |= 1
-                if cell.east:
-                    value |= 2
-                if cell.south:
-                    value |= 4
-                if cell.west:
-                    value |= 8
-
-                # >>> hex(5) -> '0x5'
-                # >>> hex(5)[-1] -> '5'
-                line_str += str(hex(value)[-1])
+    def _write_maze_file(self, f: TextIO, maze: MazeGrid):
+        """
+        Docstring for _write_maze_file
 
-            final_content.append(str(line_str))
+        Write the maze cells values in HEX format
+        """
 
-        for li in final_content:
-            f.write(li + "\n")
+        # Each mask byte holds the open sides in its 4 low bits:
+        # 1 = 0001 = north, 2 = 0010 = east, 4 = 0100 = south, 8 = west
+        # HEX_DIGITS maps every mask byte to its hex digit at once.
+        for r in range(maze.height):
+            f.write(maze.row_masks(r).translate(HEX_DIGITS).decode())
+            f.write("\n")
 
     def _write_se(self, f: TextIO):
         """
@@ -154,77 +259,312 @@ class MazeRender:
         for c in directions:
             f.write(c)
 
-    def save_maze_file(self, path: List[Tuple[int, int]]) -> None:
+    def write_maze_text(
+        self, f: TextIO, maze: MazeGrid, path: List[Tuple[int, int]]
+    ) -> None:
         """
-        Docstring for save_maze_file
+        Docstring for write_maze_text
 
-        Handles the Maze output file
+        Write the whole output file content (maze, entry / exit, path)
         """
+        self._write_maze_file(f, maze)
+        self._write_se(f)
+        self._write_path(f, path)
 
-        with open(self.o_file, "w") as file:
-            self._write_maze_file(file)
-            self._write_se(file)
-            self._write_path(file, path)
+    def save_maze_file(
+        self, maze: MazeGrid, path: List[Tuple[int, int]]
+    ) -> None:
+        """
+        Docstring for save_maze_file
 
-    def render(
-        self,
-        generated_maze: MazeManagerProtocol,
-        path: List[Tuple[int, int]],
-    ) -> str:
+        Handles the Maze output file.
+        The file is written under a temporary name in the same directory,
+        then renamed: readers never see a half written maze.
         """
-        Docstring for printmaze
+        directory = os.path.dirname(os.path.abspath(self.o_file))
+        with instrumentation.phase("save_maze_file"):
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                # mkstemp files are private (0600), a plain open() is not
+                os.chmod(tmp, 0o644)
+                with os.fdopen(fd, "w", buffering=1 << 20) as file:
+                    self.write_maze_text(file, maze, path)
+                    size = file.tell()
+                os.replace(tmp, self.o_file)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        instrumentation.add("save_maze_file.bytes_written", size)
+
+    def _add_path(
+        self, frame: List[str], path: List[Tuple[int, int]]
+    ) -> List[str]:
         """
-        self.maze = generated_maze.maze
-        self.height = generated_maze.height
-        self.width = generated_maze.width
-        self.canevas_h = (self.height * 2) + 1
-        self.canevas_w = (self.width * 2) + 1
-
-        canevas = self._get_canevas(
-            generated_maze.height, generated_maze.width
-        )
-
-        c_h = self.canevas_h
-        c_w = self.canevas_w
-        res = ""
+        Docstring for _add_path
 
-        for r in range(c_h):
-            line_str = self.COLORS[self.color] + ""
-            for c in range(c_w):
+        Copy of the frame with the path dots: only the lines
+        crossed by the path are rebuilt
+        """
+        by_line: Dict[int, List[int]] = {}
+        for mr, mc in path:
+            if (mr, mc) == self.entry or (mr, mc) == self.exit:
+                continue
+            # cell (mr, mc) is canvas (2mr+1, 2mc+1), 2 chars per canvas cell
+            by_line.setdefault(mr * 2 + 1, []).append(mc * 4 + 2)
+
+        lines = frame[:]
+        for r, positions in by_line.items():
+            chars = list(lines[r])
+            for pos in positions:
+                chars[pos] = "·"
+            lines[r] = "".join(chars)
+        return lines
+
+    def _canvas_at(
+        self, cells: Sequence[int], h: int, w: int, y: int, x: int
+    ) -> int:
+        """
+        Docstring for _canvas_at
 
-                if canevas[r][c]:
-                    n = r > 0 and canevas[r - 1][c]
-                    s = r < c_h - 1 and canevas[r + 1][c]
-                    w = c > 0 and canevas[r][c - 1]
-                    e = c < c_w - 1 and canevas[r][c + 1]
+        One point of the canvas of _get_canevas_row (1 for a wall),
+        0 outside of it
+        """
+        if not (0 <= y <= h * 2 and 0 <= x <= w * 2):
+            return 0
+        r, c = y // 2, x // 2
+        if y % 2:
+            if x % 2:
+                return 0
+            # wall between cells c - 1 and c of row r
+            index = r * w + c
+            if (c > 0 and cells[index - 1] & EAST) or (
+                c < w and cells[index] & WEST
+            ):
+                return 0
+            return 1
+        if not x % 2:
+            return 1
+        # wall between rows r - 1 and r of column c
+        if (r < h and cells[r * w + c] & NORTH) or (
+            r > 0 and cells[(r - 1) * w + c] & SOUTH
+        ):
+            return 0
+        return 1
+
+    def _char_at(
+        self, cells: Sequence[int], h: int, w: int, y: int, x: int
+    ) -> str:
+        """
+        Docstring for _char_at
 
-                    char = self.WALL_CHARS.get(
-                        (int(n), int(e), int(s), int(w)), "┼"
-                    )
-                    line_str += char + ("─" if e else " ")
-                else:
-                    content = " "
-                    # Center of element
-                    if r % 2 != 0 and c % 2 != 0:
-                        mr, mc = (r - 1) // 2, (c - 1) // 2
+        The 2 characters iter_lines draws for canvas point (y, x),
+        without the path
+        """
+        at = self._canvas_at
+        if at(cells, h, w, y, x):
+            e = at(cells, h, w, y, x + 1)
+            char = self.WALL_CHARS.get(
+                (
+                    at(cells, h, w, y - 1, x),
+                    e,
+                    at(cells, h, w, y + 1, x),
+                    at(cells, h, w, y, x - 1),
+                ),
+                "┼",
+            )
+            return char + ("─" if e else " ")
+        if y % 2 and x % 2:
+            cell = ((y - 1) // 2, (x - 1) // 2)
+            if cell == self.entry:
+                return "S "
+            if cell == self.exit:
+                return "E "
+        return "  "
+
+    def changed_chars(
+        self, generated_maze: MazeManagerProtocol, cell: int, side: int
+    ) -> List[Tuple[int, int]]:
+        """
+        Docstring for changed_chars
 
-                        # Coords in original mze
-                        if (mr, mc) == self.entry:
-                            content = "S"
+        Canvas points whose drawing changes when the `side` wall of cell
+        (flat index, side may be negative) opens or closes: the wall and
+        the 8 points around it. Point (y, x) is drawn on line y, at
+        column 2 * x.
+        """
+        w = generated_maze.width
+        r, c = divmod(cell, w)
+        side = abs(side)
+        if side == NORTH:
+            y, x = r * 2, c * 2 + 1
+        elif side == SOUTH:
+            y, x = r * 2 + 2, c * 2 + 1
+        elif side == EAST:
+            y, x = r * 2 + 1, c * 2 + 2
+        else:
+            y, x = r * 2 + 1, c * 2
+        c_h = generated_maze.height * 2 + 1
+        c_w = w * 2 + 1
+        return [
+            (py, px)
+            for py in (y - 1, y, y + 1)
+            for px in (x - 1, x, x + 1)
+            if 0 <= py < c_h and 0 <= px < c_w
+        ]
+
+    def animate(
+        self,
+        generated_maze: MazeManagerProtocol,
+        events: Iterable[Tuple[int, int]],
+        f: TextIO,
+        fps: float = 30.0,
+        steps_per_frame: int = 1,
+        top: int = 1,
+    ) -> int:
+        """
+        Docstring for animate
 
-                        elif (mr, mc) == self.exit:
-                            content = "E"
+        Play carve events (see MazeManager.iter_generate) on a terminal.
+        The maze is drawn once from terminal line `top`, then each frame
+        only rewrites the characters changed by its `steps_per_frame`
+        events, at most `fps` frames per second.
+        Returns the number of events played.
+        """
+        maze = generated_maze.maze
+        h = generated_maze.height
+        w = generated_maze.width
+        color = self.COLORS[self.color]
+        reset = self.COLORS["RESET"]
+        f.write(f"\033[{top};1H" + self.render(generated_maze, []))
+        f.flush()
+
+        dirty: set[Tuple[int, int]] = set()
+
+        def flush() -> None:
+            out = [color]
+            for y, x in sorted(dirty):
+                out.append(f"\033[{top + y};{2 * x + 1}H")
+                out.append(self._char_at(maze.cells, h, w, y, x))
+            out.append(reset)
+            f.write("".join(out))
+            f.flush()
+            dirty.clear()
+
+        frame = 1.0 / fps
+        deadline = time.perf_counter() + frame
+        played = 0
+        for cell, side in events:
+            dirty.update(self.changed_chars(generated_maze, cell, side))
+            played += 1
+            if played % steps_per_frame:
+                continue
+            flush()
+            wait = deadline - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            # a late frame does not make the next ones faster
+            deadline = max(deadline, time.perf_counter()) + frame
+        flush()
+        # cursor back under the maze
+        f.write(f"\033[{top + h * 2 + 1};1H")
+        f.flush()
+        return played
+
+    def _path_in(
+        self,
+        path: List[Tuple[int, int]],
+        rows: Tuple[int, int],
+        cols: Tuple[int, int],
+    ) -> List[Tuple[int, int]]:
+        """
+        Docstring for _path_in
 
-                        # add shortest path
-                        elif (mr, mc) in path:
-                            content = "·"
+        Cells of path inside the window. The path is indexed by row
+        once (kept until another path is given), so panning only looks
+        at the rows of the window.
+        """
+        if path is not self._path:
+            by_row: Dict[int, List[int]] = {}
+            for r, c in path:
+                by_row.setdefault(r, []).append(c)
+            for row in by_row.values():
+                row.sort()
+            self._path = path
+            self._path_rows = by_row
+        inside: List[Tuple[int, int]] = []
+        for r in range(*rows):
+            row = self._path_rows.get(r)
+            if not row:
+                continue
+            i = bisect_left(row, cols[0])
+            while i < len(row) and row[i] < cols[1]:
+                inside.append((r, row[i]))
+                i += 1
+        return inside
+
+    def render_viewport(
+        self,
+        generated_maze: MazeManagerProtocol,
+        path: List[Tuple[int, int]],
+        top: int,
+        left: int,
+        rows: int,
+        cols: int,
+    ) -> str:
+        """
+        Docstring for render_viewport
 
-                    line_str += content + " "
-            res += line_str + "\n" + self.COLORS["RESET"]
+        Draw only a window of the maze: `rows` maze rows from `top` and
+        `cols` maze columns from `left` (clamped to the maze), with the
+        path dots falling inside it. The work depends on the window
+        size, not on the maze size; nothing is cached.
+        """
+        with instrumentation.phase("render"):
+            h = generated_maze.height
+            w = generated_maze.width
+            top = max(0, min(top, h - rows))
+            left = max(0, min(left, w - cols))
+            window_rows = (top, min(h, top + rows))
+            window_cols = (left, min(w, left + cols))
+            lines = self.iter_lines(
+                generated_maze,
+                self._path_in(path, window_rows, window_cols),
+                window_rows,
+                window_cols,
+            )
+            color = self.COLORS[self.color]
+            reset = self.COLORS["RESET"]
+            return color + ("\n" + reset + color).join(lines) + "\n" + reset
 
-        self.save_maze_file(path)
+    def render(
+        self,
+        generated_maze: MazeManagerProtocol,
+        path: List[Tuple[int, int]],
+    ) -> str:
+        """
+        Docstring for printmaze
 
-        return str(res)
+        The drawing of the maze is cached per maze version: a new path
+        or a new color only redraws the lines holding path dots.
+        """
+        with instrumentation.phase("render"):
+            maze = generated_maze.maze
+            state = (maze.version, self.entry, self.exit)
+            if self._frame_maze is not maze or self._frame_state != state:
+                self.height = generated_maze.height
+                self.width = generated_maze.width
+                self.canevas_h = (self.height * 2) + 1
+                self.canevas_w = (self.width * 2) + 1
+                self._frame = list(self.iter_lines(generated_maze))
+                self._frame_maze = maze
+                self._frame_state = state
+
+            lines = self._add_path(self._frame, path) if path else self._frame
+            color = self.COLORS[self.color]
+            reset = self.COLORS["RESET"]
+
+            # color + line + "\n" + reset, for every line
+            return color + ("\n" + reset + color).join(lines) + "\n" + reset
 
 
 if __name__ == "__main__":
@@ -0,0 +1,704 @@
+"""
+Docstring for mazegen.service
+
+Long running maze service: generate / solve requests as JSON over HTTP,
+on a localhost TCP port or a Unix socket.
+
+    POST /generate  {"WIDTH": 20, "HEIGHT": 15, "SEED": 42,
+                     "PERFECT": true, "ENTRY": [0, 0], "EXIT": [14, 19]}
+                    -> {"height", "width", "entry", "exit", "seed",
+                        "grid": [hex rows], "path": "EESW...",
+                        "path_length"}
+    POST /solve     {"grid": [hex rows], "ENTRY": [0, 0],
+                     "EXIT": [14, 19], "SOLVER": "bfs"}
+                    -> {"path": "EESW...", "path_length"}
+    GET  /metrics   latency histograms, queue and cache (Prometheus text)
+    GET  /health
+
+Cells are [row, col], like the entry / exit lines of the output file.
+The other generate keys are the config file ones (ALGORITHM, SOLVER,
+LOOP_DENSITY); a missing SEED gives a random maze.
+
+Generation and solving run on a process pool, the event loop only moves
+bytes: the workers return the encoded JSON answer. Jobs wait in a
+bounded queue, and a request arriving when it is full gets 503 at once
+instead of piling up. Answers of seeded generate requests are kept in an
+LRU of recent mazes, and identical requests in flight share one job.
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import os
+import signal
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple
+from .cache import MazeCache
+from .generators import GENERATORS
+from .hexfile import HexMaze
+from .main import MazeManager
+from .models import HEX_DIGITS
+from .shortest_path import SOLVERS, path_to_directions
+
+# requests bigger than this are refused (413)
+MAX_BODY = 64 << 20
+# biggest maze a generate request may ask for
+MAX_CELLS = 4_000_000
+# upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+GENERATE_KEYS = (
+    "WIDTH",
+    "HEIGHT",
+    "SEED",
+    "PERFECT",
+    "ENTRY",
+    "EXIT",
+    "ALGORITHM",
+    "SOLVER",
+    "LOOP_DENSITY",
+)
+ENDPOINTS = ("/generate", "/solve", "/metrics", "/health")
+
+
+class HTTPError(Exception):
+    """Ends a request with this status and message"""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _cell(request: Dict[str, Any], name: str) -> Tuple[int, int]:
+    value = request.get(name)
+    if (
+        not isinstance(value, list)
+        or len(value) != 2
+        or not all(isinstance(v, int) for v in value)
+    ):
+        raise ValueError(f"{name} must be [row, col], got {value!r}")
+    return value[0], value[1]
+
+
+def _check_cells(
+    height: int, width: int, entry: Tuple[int, int], exit_: Tuple[int, int]
+) -> None:
+    for name, (r, c) in (("ENTRY", entry), ("EXIT", exit_)):
+        if not (0 <= r < height and 0 <= c < width):
+            raise ValueError(f"{name} {[r, c]} is out of the maze")
+    if entry == exit_:
+        raise ValueError("ENTRY and EXIT can not be the same cell")
+
+
+def generate_config(request: Any) -> Dict[str, Any]:
+    """
+    MazeManager config of a generate request, raises ValueError when it
+    is wrong (the remaining type checks are MazeManager's own)
+    """
+    if not isinstance(request, dict):
+        raise ValueError("the request must be a JSON object")
+    unknown = set(request) - set(GENERATE_KEYS)
+    if unknown:
+        raise ValueError(f"unknown keys: {', '.join(sorted(unknown))}")
+    missing = [
+        key
+        for key in ("WIDTH", "HEIGHT", "PERFECT", "ENTRY", "EXIT")
+        if key not in request
+    ]
+    if missing:
+        raise ValueError(f"missing keys: {', '.join(missing)}")
+
+    config = dict(request)
+    height, width = config["HEIGHT"], config["WIDTH"]
+    if not isinstance(height, int) or not isinstance(width, int):
+        raise ValueError("WIDTH and HEIGHT must be integers")
+    if height <= 0 or width <= 0 or height * width > MAX_CELLS:
+        raise ValueError(
+            f"the maze must have between 1 and {MAX_CELLS} cells"
+        )
+    config["ENTRY"] = _cell(request, "ENTRY")
+    config["EXIT"] = _cell(request, "EXIT")
+    _check_cells(height, width, config["ENTRY"], config["EXIT"])
+    config.setdefault("SEED", None)
+    config.setdefault("ALGORITHM", "dfs")
+    config.setdefault("SOLVER", "bfs")
+    if config["ALGORITHM"] not in GENERATORS:
+        raise ValueError(
+            f"ALGORITHM must be one of {', '.join(GENERATORS)}"
+        )
+    if config["SOLVER"] not in SOLVERS:
+        raise ValueError(f"SOLVER must be one of {', '.join(SOLVERS)}")
+    return config
+
+
+def solve_request(request: Any) -> Tuple[bytes, str]:
+    """
+    HEX output file content and solver name of a solve request, raises
+    ValueError when it is wrong
+    """
+    if not isinstance(request, dict):
+        raise ValueError("the request must be a JSON object")
+    grid = request.get("grid")
+    if isinstance(grid, str):
+        grid = grid.split()
+    if (
+        not isinstance(grid, list)
+        or not grid
+        or not all(isinstance(row, str) for row in grid)
+    ):
+        raise ValueError("grid must be a list of hex rows")
+    entry = _cell(request, "ENTRY")
+    exit_ = _cell(request, "EXIT")
+    _check_cells(len(grid), len(grid[0]), entry, exit_)
+    solver = request.get("SOLVER", "bfs")
+    if solver not in SOLVERS:
+        raise ValueError(f"SOLVER must be one of {', '.join(SOLVERS)}")
+    text = (
+        "\n".join(grid)
+        + f"\n\n{entry[0]},{entry[1]}\n{exit_[0]},{exit_[1]}\n"
+    )
+    try:
+        return text.encode("ascii"), solver
+    except UnicodeEncodeError:
+        raise ValueError("grid must be made of hex digits")
+
+
+def _ready() -> None:
+    """Job doing nothing: starts the worker processes"""
+
+
+def _init_worker() -> None:
+    # Ctrl-C reaches the whole process group: the server stops the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _generate_job(config: Dict[str, Any]) -> bytes:
+    """Worker: generate and solve a maze, returns the JSON answer"""
+    # no "42 pattern omitted" notice in the service output
+    with contextlib.redirect_stdout(io.StringIO()):
+        mm = MazeManager({**config, "OUTPUT_FILE": "", "COLOR": "Default"})
+    mm.generate()
+    path = SOLVERS[mm.solver]().shortest_path(
+        maze=mm.maze,
+        height=mm.height,
+        width=mm.width,
+        start=mm.entry,
+        end=mm.exit,
+    )
+    w = mm.width
+    digits = bytes(mm.maze.cells).translate(HEX_DIGITS).decode("ascii")
+    moves = "".join(path_to_directions(path)) if path else None
+    answer = {
+        "height": mm.height,
+        "width": w,
+        "entry": list(mm.entry),
+        "exit": list(mm.exit),
+        "seed": mm.seed,
+        "grid": [digits[i:i + w] for i in range(0, len(digits), w)],
+        "path": moves,
+        "path_length": len(moves) if moves is not None else None,
+    }
+    return json.dumps(answer).encode()
+
+
+def _solve_job(text: bytes, solver: str) -> bytes:
+    """Worker: solve a maze sent as HEX text, returns the JSON answer"""
+    hex_maze = HexMaze.from_bytes(text, "grid")
+    path = SOLVERS[solver]().shortest_path(
+        hex_maze.maze,
+        hex_maze.height,
+        hex_maze.width,
+        hex_maze.entry,
+        hex_maze.exit,
+    )
+    moves = "".join(path_to_directions(path)) if path else None
+    answer = {
+        "path": moves,
+        "path_length": len(moves) if moves is not None else None,
+    }
+    return json.dumps(answer).encode()
+
+
+class Histogram:
+    """Latency histogram with fixed buckets (Prometheus style)"""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS) -> None:
+        self.buckets = buckets
+        # the last count is for values above every bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def lines(self, name: str, labels: str) -> List[str]:
+        """Cumulative buckets, sum and count in the text format"""
+        result = []
+        total = 0
+        bounds = [repr(b) for b in self.buckets] + ["+Inf"]
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            result.append(f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+        result.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        result.append(f"{name}_count{{{labels}}} {self.count}")
+        return result
+
+
+class Metrics:
+    """What GET /metrics reports"""
+
+    def __init__(self) -> None:
+        # endpoint -> whole request latency
+        self.requests: Dict[str, Histogram] = {}
+        # job kind -> time waited in the queue / spent in a worker
+        self.queue_wait: Dict[str, Histogram] = {}
+        self.job: Dict[str, Histogram] = {}
+        # (endpoint, status) -> requests answered
+        self.responses: Dict[Tuple[str, int], int] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.shared = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _observe(
+        histograms: Dict[str, Histogram], key: str, seconds: float
+    ) -> None:
+        if key not in histograms:
+            histograms[key] = Histogram()
+        histograms[key].observe(seconds)
+
+    def waited(self, kind: str, seconds: float) -> None:
+        self._observe(self.queue_wait, kind, seconds)
+
+    def ran(self, kind: str, seconds: float) -> None:
+        self._observe(self.job, kind, seconds)
+
+    def request(self, endpoint: str, status: int, seconds: float) -> None:
+        self._observe(self.requests, endpoint, seconds)
+        key = (endpoint, status)
+        self.responses[key] = self.responses.get(key, 0) + 1
+
+    def render(self, gauges: Dict[str, float]) -> bytes:
+        lines = [
+            "# TYPE maze_request_seconds histogram",
+        ]
+        for endpoint, histogram in sorted(self.requests.items()):
+            lines += histogram.lines(
+                "maze_request_seconds", f'endpoint="{endpoint}"'
+            )
+        for name, histograms in (
+            ("maze_queue_wait_seconds", self.queue_wait),
+            ("maze_job_seconds", self.job),
+        ):
+            lines.append(f"# TYPE {name} histogram")
+            for kind, histogram in sorted(histograms.items()):
+                lines += histogram.lines(name, f'job="{kind}"')
+        lines.append("# TYPE maze_responses_total counter")
+        for (endpoint, status), count in sorted(self.responses.items()):
+            lines.append(
+                f'maze_responses_total{{endpoint="{endpoint}",'
+                f'status="{status}"}} {count}'
+            )
+        for name, value in (
+            ("maze_cache_hits_total", self.cache_hits),
+            ("maze_cache_misses_total", self.cache_misses),
+            ("maze_shared_jobs_total", self.shared),
+            ("maze_rejected_total", self.rejected),
+        ):
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {value}")
+        for name, value in gauges.items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return ("\n".join(lines) + "\n").encode()
+
+
+class LRUCache:
+    """Recent answers by key, bounded in total bytes"""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self._entries[key] = value
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+class MazeService:
+    """
+    The asyncio server: HTTP/1.1 (keep-alive) in front of a process pool
+
+    Args:
+        workers: processes, defaults to the number of CPUs
+        queue_size: jobs allowed to wait for a worker
+        cache_bytes: size of the LRU of generate answers
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        queue_size: int = 64,
+        cache_bytes: int = 256 << 20,
+    ) -> None:
+        if queue_size <= 0:
+            raise ValueError(f"queue_size must be positive, got {queue_size}")
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.cache = LRUCache(cache_bytes)
+        self.metrics = Metrics()
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.queue: "asyncio.Queue[Any]" = asyncio.Queue(queue_size)
+        self.running = 0
+        # cache key -> answer of the job in flight
+        self._inflight: Dict[str, "asyncio.Future[bytes]"] = {}
+        self._dispatchers: List["asyncio.Task[None]"] = []
+        # open connections: their handler task and stream
+        self._connections: Dict["asyncio.Task[Any]", asyncio.StreamWriter] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8042,
+        unix: Optional[str] = None,
+    ) -> asyncio.AbstractServer:
+        """Start the workers, then listen on host:port or on unix"""
+        loop = asyncio.get_running_loop()
+        self.pool = ProcessPoolExecutor(
+            self.workers, initializer=_init_worker
+        )
+        # the workers are started (and warm) before the first request
+        await loop.run_in_executor(self.pool, _ready)
+        self._dispatchers = [
+            asyncio.create_task(self._dispatch())
+            for _ in range(self.workers)
+        ]
+        if unix is not None:
+            self._server = await asyncio.start_unix_server(
+                self._connection, unix
+            )
+        else:
+            self._server = await asyncio.start_server(
+                self._connection, host, port
+            )
+        return self._server
+
+    async def close(self) -> None:
+        """
+        Stop listening, finish the queued jobs and answer them, then close
+        the connections and stop the workers
+        """
+        if self._server is not None:
+            self._server.close()
+        await self.queue.join()
+        for writer in self._connections.values():
+            writer.close()
+        if self._connections:
+            await asyncio.wait(list(self._connections), timeout=1.0)
+        for task in self._dispatchers:
+            task.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+    async def _dispatch(self) -> None:
+        """Feed queued jobs to the pool, one at a time"""
+        loop = asyncio.get_running_loop()
+        while True:
+            kind, job, args, future, queued = await self.queue.get()
+            try:
+                if future.done():
+                    # the client went away while it waited
+                    continue
+                start = time.perf_counter()
+                self.metrics.waited(kind, start - queued)
+                self.running += 1
+                try:
+                    result = await loop.run_in_executor(self.pool, job, *args)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+                finally:
+                    self.running -= 1
+                    self.metrics.ran(kind, time.perf_counter() - start)
+            finally:
+                self.queue.task_done()
+
+    def _submit(
+        self, kind: str, job: Any, *args: Any
+    ) -> "asyncio.Future[Any]":
+        """Queue a job, refused with 503 when the queue is full"""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait(
+                (kind, job, args, future, time.perf_counter())
+            )
+        except asyncio.QueueFull:
+            self.metrics.rejected += 1
+            raise HTTPError(
+                HTTPStatus.SERVICE_UNAVAILABLE, "too many queued jobs"
+            )
+        return future
+
+    async def generate(self, request: Any) -> Tuple[bytes, bool]:
+        """JSON answer of a generate request, and whether it was cached"""
+        config = generate_config(request)
+        if config["SEED"] is None:
+            # a random maze: nothing to share or to remember
+            return await self._submit("generate", _generate_job, config), False
+
+        key = MazeCache.key(config)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.metrics.cache_hits += 1
+            return cached, True
+        self.metrics.cache_misses += 1
+        future = self._inflight.get(key)
+        if future is not None:
+            self.metrics.shared += 1
+        else:
+            future = self._submit("generate", _generate_job, config)
+            self._inflight[key] = future
+            future.add_done_callback(
+                lambda done: self._generated(key, done)
+            )
+        # one waiter going away must not cancel the others
+        return await asyncio.shield(future), False
+
+    def _generated(self, key: str, future: "asyncio.Future[bytes]") -> None:
+        self._inflight.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(key, future.result())
+
+    async def solve(self, request: Any) -> bytes:
+        """JSON answer of a solve request"""
+        text, solver = solve_request(request)
+        return await self._submit("solve", _solve_job, text, solver)
+
+    def gauges(self) -> Dict[str, float]:
+        return {
+            "maze_queue_depth": self.queue.qsize(),
+            "maze_queue_capacity": self.queue_size,
+            "maze_jobs_running": self.running,
+            "maze_workers": self.workers,
+            "maze_cache_entries": len(self.cache),
+            "maze_cache_bytes": self.cache.size,
+        }
+
+    async def _route(
+        self, method: str, target: str, body: bytes
+    ) -> Tuple[int, bytes, List[str]]:
+        """Status, body and extra headers of one request"""
+        path = target.split("?", 1)[0]
+        if path not in ENDPOINTS:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"no such endpoint {path}")
+        expected = "POST" if path in ("/generate", "/solve") else "GET"
+        if method != expected:
+            raise HTTPError(
+                HTTPStatus.METHOD_NOT_ALLOWED, f"{path} expects {expected}"
+            )
+        if path == "/health":
+            return HTTPStatus.OK, b'{"status": "ok"}', []
+        if path == "/metrics":
+            return HTTPStatus.OK, self.metrics.render(self.gauges()), [
+                "Content-Type: text/plain; version=0.0.4"
+            ]
+
+        try:
+            request = json.loads(body)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "the body is not JSON")
+        try:
+            if path == "/generate":
+                answer, cached = await self.generate(request)
+                return HTTPStatus.OK, answer, [
+                    f"X-Cache: {'hit' if cached else 'miss'}"
+                ]
+            return HTTPStatus.OK, await self.solve(request), []
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+
+    async def _connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Answer the requests of one connection until it is closed"""
+        task = asyncio.current_task()
+        if task is not None:
+            self._connections[task] = writer
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    request = await _read_request(reader)
+                except HTTPError as e:
+                    # the stream is out of sync: answer and close
+                    writer.write(_response(e.status, _error(e), [], False))
+                    await writer.drain()
+                    return
+                if request is None:
+                    return
+                method, target, keep_alive, body = request
+
+                start = time.perf_counter()
+                path = target.split("?", 1)[0]
+                endpoint = path if path in ENDPOINTS else "other"
+                headers: List[str] = []
+                try:
+                    status, answer, headers = await self._route(
+                        method, target, body
+                    )
+                except HTTPError as e:
+                    status, answer = e.status, _error(e)
+                except Exception as e:
+                    status = HTTPStatus.INTERNAL_SERVER_ERROR
+                    answer = json.dumps({"error": repr(e)}).encode()
+                if status == HTTPStatus.SERVICE_UNAVAILABLE:
+                    headers = ["Retry-After: 1"]
+                writer.write(_response(status, answer, headers, keep_alive))
+                await writer.drain()
+                self.metrics.request(
+                    endpoint, int(status), time.perf_counter() - start
+                )
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if task is not None:
+                self._connections.pop(task, None)
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+
+def _error(e: HTTPError) -> bytes:
+    return json.dumps({"error": str(e)}).encode()
+
+
+async def _read_request(
+    reader: asyncio.StreamReader,
+) -> Optional[Tuple[str, str, bool, bytes]]:
+    """
+    Method, target, keep-alive and body of the next request, None when
+    the client closed the connection between two requests
+    """
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "incomplete request")
+    except asyncio.LimitOverrunError:
+        raise HTTPError(
+            HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "headers too large"
+        )
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "bad request line")
+    headers: Dict[str, str] = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+    if "transfer-encoding" in headers:
+        raise HTTPError(
+            HTTPStatus.LENGTH_REQUIRED, "send the body with Content-Length"
+        )
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "bad Content-Length")
+    if length < 0 or length > MAX_BODY:
+        raise HTTPError(
+            HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+            f"the body must be at most {MAX_BODY} bytes",
+        )
+    body = await reader.readexactly(length)
+
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.0":
+        keep_alive = connection == "keep-alive"
+    else:
+        keep_alive = connection != "close"
+    return method, target, keep_alive, body
+
+
+def _response(
+    status: int, body: bytes, headers: List[str], keep_alive: bool
+) -> bytes:
+    lines = [f"HTTP/1.1 {int(status)} {HTTPStatus(status).phrase}"]
+    if not any(h.startswith("Content-Type:") for h in headers):
+        lines.append("Content-Type: application/json")
+    lines += headers
+    lines.append(f"Content-Length: {len(body)}")
+    lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8042,
+    unix: Optional[str] = None,
+    workers: Optional[int] = None,
+    queue_size: int = 64,
+    cache_bytes: int = 256 << 20,
+) -> None:
+    """Run a MazeService until SIGINT / SIGTERM"""
+
+    async def run() -> None:
+        service = MazeService(workers, queue_size, cache_bytes)
+        await service.start(host, port, unix)
+        where = unix if unix is not None else f"http://{host}:{port}"
+        print(f"Maze service on {where} ({service.workers} workers)")
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        try:
+            await stop.wait()
+        finally:
+            await service.close()
+            if unix is not None:
+                with contextlib.suppress(OSError):
+                    os.unlink(unix)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    exit()
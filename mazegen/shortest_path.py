@@ -1,6 +1,10 @@
+from abc import ABC, abstractmethod
+from array import array
 from collections import deque
-from typing import Deque, Dict, List, Optional, Tuple
-from .models import MazeCell
+from heapq import heappop, heappush
+from typing import Deque, Dict, List, Optional, Tuple, Type
+from .instrument import instrumentation
+from .models import MazeGrid, NORTH, EAST, SOUTH, WEST, PATTERN
 
 
 def path_to_directions(path: List[Tuple[int, int]]) -> List[str]:
@@ -29,89 +33,447 @@ def path_to_directions(path: List[Tuple[int, int]]) -> List[str]:
     return directions
 
 
-class BFS:
+def open_neighbors(cells: bytearray, cur: int, h: int, w: int) -> List[int]:
+    """Cells reachable in one move from cur (open wall, not the 42)"""
+    mask = cells[cur]
+    c = cur % w
+    neighbors: List[int] = []
+
+    # if north-side wall open & x north border wall &  x 42 pattern
+    if mask & NORTH and cur >= w and not cells[cur - w] & PATTERN:
+        neighbors.append(cur - w)
+    if mask & SOUTH and cur < (h - 1) * w and not cells[cur + w] & PATTERN:
+        neighbors.append(cur + w)
+    if mask & WEST and c > 0 and not cells[cur - 1] & PATTERN:
+        neighbors.append(cur - 1)
+    if mask & EAST and c < w - 1 and not cells[cur + 1] & PATTERN:
+        neighbors.append(cur + 1)
+
+    return neighbors
+
+
+class Solver(ABC):
     """
-    Breadtg-First Search
-    There may be multiple shortest paths,
-    but BFS returns the first one discovered according to the FIFO principle.
+    Shortest path search between two cells of a maze
+
+    Subclasses implement _search() on flat cell indexes. Every solver
+    returns a shortest path (list of (row, col), start and end included)
+    or None, and leaves in nodes_expanded the number of cells it took
+    out of its frontier, to compare their cost on the same maze.
     """
 
+    def __init__(self) -> None:
+        self.nodes_expanded = 0
+
     def shortest_path(
         self,
-        maze: List[List[MazeCell]],
+        maze: MazeGrid,
         height: int,
         width: int,
         start: Tuple[int, int],
         end: Tuple[int, int],
     ) -> Optional[List[Tuple[int, int]]]:
+        self.nodes_expanded = 0
         if height <= 0 or width <= 0:
             return None
         if not self._in_bounds(start, height, width):
             return None
         if not self._in_bounds(end, height, width):
             return None
-        if maze[start[0]][start[1]].forty_two_pattern:
+        cells = maze.cells
+        s = start[0] * width + start[1]
+        e = end[0] * width + end[1]
+        if cells[s] & PATTERN or cells[e] & PATTERN:
             return None
-        if maze[end[0]][end[1]].forty_two_pattern:
+
+        with instrumentation.phase("solve"):
+            path = self._search(cells, height, width, s, e)
+        instrumentation.add("solve.nodes_expanded", self.nodes_expanded)
+        if path is None:
             return None
+        return [(i // width, i % width) for i in path]
+
+    @abstractmethod
+    def _search(
+        self, cells: bytearray, h: int, w: int, start: int, end: int
+    ) -> Optional[List[int]]:
+        """Flat indexes of a shortest path from start to end, or None"""
+
+    # ----------helpers---------------
 
-        queue: Deque[Tuple[int, int]] = deque([start])
-        parent: Dict[Tuple[int, int], Tuple[int, int] | None] = {start: None}
+    def _in_bounds(self, pos: Tuple[int, int], h: int, w: int) -> bool:
+        r, c = pos
+        return 0 <= r < h and 0 <= c < w
+
+    def _reconstruct_path(
+        self, parent: Dict[int, int], end: int
+    ) -> List[int]:
+        path: List[int] = []
+        node = end
+        while node != -1:
+            path.append(node)
+            node = parent[node]
+        path.reverse()
+        return path
+
+    def _neighbors(
+        self, cells: bytearray, cur: int, h: int, w: int
+    ) -> List[int]:
+        return open_neighbors(cells, cur, h, w)
+
+
+class BFS(Solver):
+    """
+    Breadtg-First Search
+    There may be multiple shortest paths,
+    but BFS returns the first one discovered according to the FIFO principle.
+    """
+
+    def _search(
+        self, cells: bytearray, h: int, w: int, start: int, end: int
+    ) -> Optional[List[int]]:
+        queue: Deque[int] = deque([start])
+        parent: Dict[int, int] = {start: -1}
 
         while queue:
             cur = queue.popleft()
+            self.nodes_expanded += 1
             if cur == end:
                 return self._reconstruct_path(parent, end)
 
-            for neighbor in self._neighbors(cur, maze, height, width):
+            for neighbor in self._neighbors(cells, cur, h, w):
                 if neighbor not in parent:
                     parent[neighbor] = cur  # visited
                     queue.append(neighbor)
 
         return None
 
-    # ----------helpers---------------
 
-    def _in_bounds(self, pos: Tuple[int, int], h: int, w: int) -> bool:
-        r, c = pos
-        return 0 <= r < h and 0 <= c < w
+class BidirectionalBFS(Solver):
+    """
+    Two BFS, from start and from end, expanding the smaller frontier one
+    full layer at a time. The first layer where they meet holds a
+    shortest path: the meeting cell with the lowest total distance.
+    """
 
-    def _reconstruct_path(
+    def _search(
+        self, cells: bytearray, h: int, w: int, start: int, end: int
+    ) -> Optional[List[int]]:
+        if start == end:
+            self.nodes_expanded = 1
+            return [start]
+
+        # parent and distance of every cell reached by each side
+        parents: Tuple[Dict[int, int], Dict[int, int]] = (
+            {start: -1},
+            {end: -1},
+        )
+        dists: Tuple[Dict[int, int], Dict[int, int]] = ({start: 0}, {end: 0})
+        frontiers: List[List[int]] = [[start], [end]]
+
+        while frontiers[0] and frontiers[1]:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            parent, dist = parents[side], dists[side]
+            other_dist = dists[1 - side]
+
+            best = -1
+            best_len = 0
+            layer: List[int] = []
+            for cur in frontiers[side]:
+                self.nodes_expanded += 1
+                for neighbor in self._neighbors(cells, cur, h, w):
+                    if neighbor in parent:
+                        continue
+                    parent[neighbor] = cur
+                    dist[neighbor] = dist[cur] + 1
+                    layer.append(neighbor)
+                    if neighbor in other_dist:
+                        length = dist[neighbor] + other_dist[neighbor]
+                        if best == -1 or length < best_len:
+                            best, best_len = neighbor, length
+            frontiers[side] = layer
+
+            if best != -1:
+                path = self._reconstruct_path(parents[0], best)
+                node = parents[1][best]
+                while node != -1:
+                    path.append(node)
+                    node = parents[1][node]
+                return path
+
+        return None
+
+
+class AStar(Solver):
+    """
+    A* search with the Manhattan distance to the end as heuristic.
+    The heuristic never overestimates (one move = one cell), so the
+    path found is a shortest one.
+    """
+
+    def _search(
+        self, cells: bytearray, h: int, w: int, start: int, end: int
+    ) -> Optional[List[int]]:
+        end_r, end_c = divmod(end, w)
+        parent: Dict[int, int] = {start: -1}
+        cost: Dict[int, int] = {start: 0}
+        heap: List[Tuple[int, int, int]] = [(0, 0, start)]
+
+        while heap:
+            _, g, cur = heappop(heap)
+            g = -g
+            if g > cost[cur]:
+                continue  # already expanded with a shorter path
+            self.nodes_expanded += 1
+            if cur == end:
+                return self._reconstruct_path(parent, end)
+
+            g += 1
+            for neighbor in self._neighbors(cells, cur, h, w):
+                if g < cost.get(neighbor, g + 1):
+                    cost[neighbor] = g
+                    parent[neighbor] = cur
+                    r, c = divmod(neighbor, w)
+                    f = g + abs(r - end_r) + abs(c - end_c)
+                    # ties: prefer the cell deeper in the search
+                    heappush(heap, (f, -g, neighbor))
+
+        return None
+
+
+class DistanceField:
+    """
+    Distance from every cell to one target cell (usually the exit)
+
+    Built once with a reverse BFS from the target. For each cell it
+    stores the distance (`distances`, -1 when unreachable) and the
+    direction of the next move toward the target on 2 bits
+    (N=0, E=1, S=2, W=3, four cells per byte in `hops`). The route from
+    any cell is then read in O(path length) without any search.
+    """
+
+    LETTERS = "NESW"
+
+    def __init__(
         self,
-        parent: Dict[Tuple[int, int], Tuple[int, int] | None],
-        end: Tuple[int, int],
-    ) -> List[Tuple[int, int]]:
-        path: List[Tuple[int, int]] = []
-        node: Tuple[int, int] | None = end
-        while node is not None:
-            path.append(node)
-            node = parent[node]
-        path.reverse()
+        maze: MazeGrid,
+        height: int,
+        width: int,
+        target: Tuple[int, int],
+    ) -> None:
+        self.height = height
+        self.width = width
+        self.target = target
+        n = height * width
+        self.distances = array("i", [-1]) * n
+        self.hops = bytearray((n + 3) // 4)
+
+        cells = maze.cells
+        w = width
+        t = target[0] * w + target[1]
+        if cells[t] & PATTERN:
+            return
+
+        # (open side seen from cur, offset to the neighbor,
+        #  2-bit code of the move from the neighbor back to cur)
+        moves = (
+            (NORTH, -w, 2),
+            (SOUTH, w, 0),
+            (WEST, -1, 1),
+            (EAST, 1, 3),
+        )
+        distances = self.distances
+        hops = self.hops
+        distances[t] = 0
+        queue: Deque[int] = deque([t])
+        while queue:
+            cur = queue.popleft()
+            mask = cells[cur]
+            c = cur % w
+            for side, offset, hop in moves:
+                if not mask & side:
+                    continue
+                nxt = cur + offset
+                if (
+                    not 0 <= nxt < n
+                    or (side == WEST and c == 0)
+                    or (side == EAST and c == w - 1)
+                    or distances[nxt] != -1
+                    or cells[nxt] & PATTERN
+                ):
+                    continue
+                distances[nxt] = distances[cur] + 1
+                hops[nxt >> 2] |= hop << ((nxt & 3) << 1)
+                queue.append(nxt)
+
+    def distance(self, start: Tuple[int, int]) -> Optional[int]:
+        """Number of moves from start to the target, None if unreachable"""
+        d = self.distances[start[0] * self.width + start[1]]
+        return None if d == -1 else d
+
+    def _moves(self, start: Tuple[int, int]) -> Optional[List[int]]:
+        """2-bit codes of the moves from start to the target"""
+        w = self.width
+        index = start[0] * w + start[1]
+        if self.distances[index] == -1:
+            return None
+        offsets = (-w, 1, w, -1)
+        moves: List[int] = []
+        for _ in range(self.distances[index]):
+            hop = (self.hops[index >> 2] >> ((index & 3) << 1)) & 3
+            moves.append(hop)
+            index += offsets[hop]
+        return moves
+
+    def route(self, start: Tuple[int, int]) -> Optional[List[Tuple[int, int]]]:
+        """Shortest path from start to the target (both included)"""
+        moves = self._moves(start)
+        if moves is None:
+            return None
+        steps = ((-1, 0), (0, 1), (1, 0), (0, -1))
+        r, c = start
+        path = [(r, c)]
+        for hop in moves:
+            dr, dc = steps[hop]
+            r, c = r + dr, c + dc
+            path.append((r, c))
         return path
 
-    def _neighbors(
-        self, cur: Tuple[int, int], maze: List[List[MazeCell]], h: int, w: int
-    ) -> List[Tuple[int, int]]:
-        r, c = cur
-        cur_cell = maze[r][c]
-        neighbors: List[Tuple[int, int]] = []
-
-        # if north-side wall open & x north border wall &  x 42 pattern
-        if cur_cell.north and r > 0 and not maze[r - 1][c].forty_two_pattern:
-            neighbors.append((r - 1, c))
-        if (
-            cur_cell.south
-            and r < h - 1
-            and not maze[r + 1][c].forty_two_pattern
-        ):
-            neighbors.append((r + 1, c))
-        if cur_cell.west and c > 0 and not maze[r][c - 1].forty_two_pattern:
-            neighbors.append((r, c - 1))
-        if (
-            cur_cell.east
-            and c < w - 1
-            and not maze[r][c + 1].forty_two_pattern
-        ):
-            neighbors.append((r, c + 1))
-
-        return neighbors
+    def directions(self, start: Tuple[int, int]) -> Optional[List[str]]:
+        """Same as path_to_directions(route(start)), without the route"""
+        moves = self._moves(start)
+        if moves is None:
+            return None
+        return [self.LETTERS[hop] for hop in moves]
+
+
+class TreePathIndex:
+    """
+    Any-to-any path queries on a perfect maze
+
+    A perfect maze is a spanning tree of its free cells. It is rooted
+    once (BFS from the first free cell) and every cell gets its depth,
+    its parent and binary lifting ancestor tables (`up[k][v]` is the
+    2**k-th ancestor of v), all in flat int arrays. Then:
+    - path_length() costs O(log n) (lowest common ancestor)
+    - path() costs O(path length)
+    When the maze is not a tree (loops or cut cells), `is_tree` is False
+    and both queries fall back to a BFS.
+    """
+
+    def __init__(self, maze: MazeGrid, height: int, width: int) -> None:
+        self.maze = maze
+        self.height = height
+        self.width = width
+        self.is_tree = False
+        self.depth = array("i")
+        self.up: List[array] = []
+
+        cells = maze.cells
+        n = height * width
+        # cells may be any buffer (a memoryview from load_binary)
+        free = n - sum(1 for m in cells if m & PATTERN)
+        root = next((i for i in range(n) if not cells[i] & PATTERN), -1)
+        if root == -1:
+            return
+
+        depth = array("i", [-1]) * n
+        parent = array("i", [-1]) * n
+        depth[root] = 0
+        parent[root] = root
+        queue: Deque[int] = deque([root])
+        reached = 0
+        while queue:
+            cur = queue.popleft()
+            reached += 1
+            for neighbor in open_neighbors(cells, cur, height, width):
+                if depth[neighbor] == -1:
+                    depth[neighbor] = depth[cur] + 1
+                    parent[neighbor] = cur
+                    queue.append(neighbor)
+                elif neighbor != parent[cur]:
+                    return  # a second way to reach a cell: a loop
+        if reached != free:
+            return
+
+        self.is_tree = True
+        self.depth = depth
+        self.up = [parent]
+        for _ in range(1, max(depth).bit_length()):
+            prev = self.up[-1]
+            self.up.append(
+                array("i", [prev[p] if p != -1 else -1 for p in prev])
+            )
+
+    def _index(self, pos: Tuple[int, int]) -> int:
+        r, c = pos
+        if not (0 <= r < self.height and 0 <= c < self.width):
+            return -1
+        index = r * self.width + c
+        return -1 if self.maze.cells[index] & PATTERN else index
+
+    def _lca(self, a: int, b: int) -> int:
+        depth = self.depth
+        up = self.up
+        if depth[a] < depth[b]:
+            a, b = b, a
+        diff = depth[a] - depth[b]
+        k = 0
+        while diff:
+            if diff & 1:
+                a = up[k][a]
+            diff >>= 1
+            k += 1
+        if a == b:
+            return a
+        for k in range(len(up) - 1, -1, -1):
+            if up[k][a] != up[k][b]:
+                a = up[k][a]
+                b = up[k][b]
+        return up[0][a]
+
+    def path_length(
+        self, start: Tuple[int, int], end: Tuple[int, int]
+    ) -> Optional[int]:
+        """Number of moves of the shortest path, None if there is none"""
+        if not self.is_tree:
+            path = self.path(start, end)
+            return None if path is None else len(path) - 1
+        a, b = self._index(start), self._index(end)
+        if a == -1 or b == -1:
+            return None
+        depth = self.depth
+        return depth[a] + depth[b] - 2 * depth[self._lca(a, b)]
+
+    def path(
+        self, start: Tuple[int, int], end: Tuple[int, int]
+    ) -> Optional[List[Tuple[int, int]]]:
+        """Shortest path from start to end (both included)"""
+        if not self.is_tree:
+            return BFS().shortest_path(
+                self.maze, self.height, self.width, start, end
+            )
+        a, b = self._index(start), self._index(end)
+        if a == -1 or b == -1:
+            return None
+        top = self._lca(a, b)
+        parent = self.up[0]
+        down: List[int] = []
+        while a != top:
+            down.append(a)
+            a = parent[a]
+        down.append(top)
+        rise: List[int] = []
+        while b != top:
+            rise.append(b)
+            b = parent[b]
+        w = self.width
+        return [(i // w, i % w) for i in down + rise[::-1]]
+
+
+# solvers accepted in the SOLVER config key
+SOLVERS: Dict[str, Type[Solver]] = {
+    "bfs": BFS,
+    "bidirectional": BidirectionalBFS,
+    "astar": AStar,
+}
@@ -0,0 +1,298 @@
+"""
+Docstring for mazegen.tiled
+
+Tiled generation of very large mazes on several processes.
+
+The grid is cut into square tiles. Each tile is carved on its own by an
+engine (DFS by default) seeded from a base seed and the tile index, so
+the workers share nothing and may run in any order. The tiles are then
+stitched: every pair of neighbouring tiles is an edge of the tile graph,
+and a random spanning tree of that graph (seeded Kruskal) decides which
+borders get one opening. Trees joined by a spanning tree give a tree:
+the result is a perfect maze, identical for any number of workers.
+
+42 pattern cells stay closed. When they cut a piece of a tile off from
+the rest of it, the piece is not given to the engine: its cells are
+left as single cells, stitched like the tiles.
+"""
+
+import hashlib
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+from .generators import GENERATORS, register_generator
+from .models import MazeGrid, NORTH, EAST, SOUTH, WEST, PATTERN
+
+# rows and columns of a tile
+TILE_SIZE = 512
+
+# (first row, first col, height, width) of a tile
+Tile = Tuple[int, int, int, int]
+# stitching candidates: (component, component, side) -> flat indexes of
+# the cells whose `side` wall joins the two components
+Candidates = Dict[Tuple[int, int, int], Sequence[int]]
+
+
+def tile_seed(base: int, index: int) -> int:
+    """Seed of tile `index`, only depends on the base seed and index"""
+    digest = hashlib.sha256(f"{base}:{index}".encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+def _free_components(cells: bytearray, w: int) -> Tuple[List[int], int]:
+    """
+    Label of every cell by connected area of non-pattern cells (walls
+    ignored), -1 for pattern cells, and the number of areas
+    """
+    n = len(cells)
+    labels = [-1] * n
+    count = 0
+    for start in range(n):
+        if labels[start] != -1 or cells[start] & PATTERN:
+            continue
+        labels[start] = count
+        stack = [start]
+        while stack:
+            cur = stack.pop()
+            col = cur % w
+            for nxt, ok in (
+                (cur - w, cur >= w),
+                (cur + w, cur + w < n),
+                (cur - 1, col > 0),
+                (cur + 1, col < w - 1),
+            ):
+                if ok and labels[nxt] == -1 and not cells[nxt] & PATTERN:
+                    labels[nxt] = count
+                    stack.append(nxt)
+        count += 1
+    return labels, count
+
+
+def carve_tile(
+    engine: str,
+    height: int,
+    width: int,
+    pattern: List[Tuple[int, int]],
+    seed: int,
+) -> Tuple[bytes, Optional[List[int]]]:
+    """
+    Worker: carve one tile, returns its masks and the component of each
+    cell (None when the tile is one component, numbered 0)
+
+    The biggest area of non-pattern cells goes to the engine; cells of
+    smaller areas (cut off by the 42) become single cell components.
+    """
+    grid = MazeGrid(height, width, pattern)
+    cells = grid.cells
+    labels: Optional[List[int]] = None
+    if pattern:
+        areas, count = _free_components(cells, width)
+        if count > 1:
+            sizes = [0] * count
+            for label in areas:
+                if label >= 0:
+                    sizes[label] += 1
+            main = sizes.index(max(sizes))
+            labels = [-1] * len(cells)
+            cut_off = 0
+            for index, label in enumerate(areas):
+                if label == main:
+                    labels[index] = 0
+                elif label >= 0:
+                    cut_off += 1
+                    labels[index] = cut_off
+                    # engines expect one connected area
+                    cells[index] = PATTERN
+    GENERATORS[engine](grid, random.Random(seed))
+    if labels is not None:
+        for index, label in enumerate(labels):
+            if label > 0:
+                cells[index] = 0
+    return bytes(cells), labels
+
+
+class TiledGenerator:
+    """
+    Tiled, multi-process engine: an Engine (called with a grid and a
+    random.Random) with its own settings
+
+    Args:
+        tile_size: rows and columns of a tile (changes the maze)
+        workers: processes, defaults to the number of CPUs (does not
+            change the maze)
+        engine: GENERATORS engine carving each tile (not eller)
+    """
+
+    def __init__(
+        self,
+        tile_size: int = TILE_SIZE,
+        workers: Optional[int] = None,
+        engine: str = "dfs",
+    ) -> None:
+        if tile_size <= 0:
+            raise ValueError(f"tile_size must be positive, got {tile_size}")
+        # eller places its own 42 from the maze size, not from the grid
+        if engine not in GENERATORS or engine in ("tiled", "eller"):
+            raise ValueError(f"{engine!r} can not carve tiles")
+        self.tile_size = tile_size
+        self.workers = workers or os.cpu_count() or 1
+        self.engine = engine
+
+    def tiles(self, grid: MazeGrid) -> List[Tile]:
+        """The tiles of grid, row by row"""
+        size = self.tile_size
+        return [
+            (r0, c0, min(size, grid.height - r0), min(size, grid.width - c0))
+            for r0 in range(0, grid.height, size)
+            for c0 in range(0, grid.width, size)
+        ]
+
+    def __call__(self, grid: MazeGrid, rng: random.Random) -> None:
+        cells = grid.cells
+        w = grid.width
+        tiles = self.tiles(grid)
+        base = rng.getrandbits(64)
+
+        patterns: List[List[Tuple[int, int]]] = [[] for _ in tiles]
+        per_row = -(-w // self.tile_size)
+        index = cells.find(PATTERN)
+        while index != -1:
+            r, c = divmod(index, w)
+            t = (r // self.tile_size) * per_row + c // self.tile_size
+            r0, c0, _, _ = tiles[t]
+            patterns[t].append((r - r0, c - c0))
+            index = cells.find(PATTERN, index + 1)
+
+        jobs = (
+            [self.engine] * len(tiles),
+            [tile[2] for tile in tiles],
+            [tile[3] for tile in tiles],
+            patterns,
+            [tile_seed(base, t) for t in range(len(tiles))],
+        )
+        workers = min(self.workers, len(tiles))
+        if workers <= 1:
+            carved = list(map(carve_tile, *jobs))
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                carved = list(pool.map(carve_tile, *jobs))
+
+        for (r0, c0, th, tw), (masks, _) in zip(tiles, carved):
+            view = memoryview(masks)
+            for r in range(th):
+                start = (r0 + r) * w + c0
+                cells[start:start + tw] = view[r * tw:(r + 1) * tw]
+
+        self._stitch(grid, tiles, carved, patterns, rng)
+
+    def _stitch(
+        self,
+        grid: MazeGrid,
+        tiles: List[Tile],
+        carved: List[Tuple[bytes, Optional[List[int]]]],
+        patterns: List[List[Tuple[int, int]]],
+        rng: random.Random,
+    ) -> None:
+        """Open the walls of a random spanning tree of the components"""
+        cells = grid.cells
+        w = grid.width
+        per_row = -(-w // self.tile_size)
+
+        # first global component number of each tile
+        first: List[int] = []
+        total = 0
+        for _, labels in carved:
+            first.append(total)
+            total += 1 if labels is None else max(labels) + 1
+
+        def component(t: int, i: int) -> int:
+            labels = carved[t][1]
+            if labels is None:
+                return first[t]
+            r0, c0, _, tw = tiles[t]
+            r, c = divmod(i, w)
+            return first[t] + labels[(r - r0) * tw + c - c0]
+
+        candidates: Candidates = {}
+        # candidates found cell by cell (tiles with cut off cells)
+        found: Dict[Tuple[int, int, int], List[int]] = {}
+
+        def add(a_tile: int, b_tile: int, side: int, i: int) -> None:
+            j = i + (1 if side == EAST else w)
+            if (cells[i] | cells[j]) & PATTERN:
+                return
+            a, b = component(a_tile, i), component(b_tile, j)
+            if a != b:
+                found.setdefault((a, b, side), []).append(i)
+
+        def add_border(
+            a_tile: int, b_tile: int, side: int, walls: range
+        ) -> None:
+            if carved[a_tile][1] is not None or carved[b_tile][1] is not None:
+                for i in walls:
+                    add(a_tile, b_tile, side, i)
+                return
+            key = (first[a_tile], first[b_tile], side)
+            if not patterns[a_tile] and not patterns[b_tile]:
+                # the usual case: any wall of the border will do
+                candidates[key] = walls
+                return
+            step = 1 if side == EAST else w
+            kept = [
+                i for i in walls if not (cells[i] | cells[i + step]) & PATTERN
+            ]
+            if kept:
+                candidates[key] = kept
+
+        for t, (r0, c0, th, tw) in enumerate(tiles):
+            if carved[t][1] is not None:
+                # walls between the cut off cells of the tile
+                for r in range(r0, r0 + th):
+                    for c in range(c0, c0 + tw):
+                        if c + 1 < c0 + tw:
+                            add(t, t, EAST, r * w + c)
+                        if r + 1 < r0 + th:
+                            add(t, t, SOUTH, r * w + c)
+            if c0 + tw < w:
+                # last column of the tile / first one of the next tile
+                start = r0 * w + c0 + tw - 1
+                add_border(t, t + 1, EAST, range(start, start + th * w, w))
+            if r0 + th < grid.height:
+                # last row of the tile / first one of the tile below
+                start = (r0 + th - 1) * w + c0
+                add_border(t, t + per_row, SOUTH, range(start, start + tw))
+        candidates.update(found)
+
+        # seeded Kruskal over the components
+        parent = list(range(total))
+
+        def find(a: int) -> int:
+            while parent[a] != a:
+                parent[a] = parent[parent[a]]
+                a = parent[a]
+            return a
+
+        keys = list(candidates)
+        rng.shuffle(keys)
+        back = {EAST: WEST, SOUTH: NORTH}
+        for key in keys:
+            a, b = find(key[0]), find(key[1])
+            if a == b:
+                continue
+            parent[b] = a
+            side = key[2]
+            i = rng.choice(candidates[key])
+            cells[i] |= side
+            cells[i + (1 if side == EAST else w)] |= back[side]
+        grid.touch()
+
+
+@register_generator("tiled")
+def generate_tiled(grid: MazeGrid, rng: random.Random) -> None:
+    """DFS tiles of TILE_SIZE on every CPU, stitched (see TiledGenerator)"""
+    TiledGenerator()(grid, rng)
+
+
+if __name__ == "__main__":
+    exit()
@@ -0,0 +1,77 @@
+"""
+Docstring for mazegen.writer
+
+Background writing of the output file.
+A single thread owns the disk I/O: the interactive UI only queues a
+snapshot of the maze and its path, and never waits on the file system.
+"""
+
+import queue
+import threading
+from typing import List, Optional, Tuple
+from .models import MazeGrid
+from .render import MazeRender
+
+Job = Tuple[MazeGrid, List[Tuple[int, int]]]
+
+
+class OutputWriter:
+    """
+    Writes OUTPUT_FILE with MazeRender.save_maze_file on its own thread
+
+    Jobs are written in submission order, so the file always ends up
+    holding the last submitted maze. An error of the thread is raised
+    again by the next submit(), wait() or close().
+    """
+
+    def __init__(self, renderer: MazeRender) -> None:
+        self.renderer = renderer
+        self._jobs: "queue.Queue[Optional[Job]]" = queue.Queue()
+        self._error: BaseException | None = None
+        self._thread = threading.Thread(
+            target=self._run, name="maze-output-writer", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            job = self._jobs.get()
+            try:
+                if job is None:
+                    return
+                if self._error is None:
+                    self.renderer.save_maze_file(*job)
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._jobs.task_done()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def submit(self, maze: MazeGrid, path: List[Tuple[int, int]]) -> None:
+        """Queue the writing of maze and path (copied, returns at once)"""
+        self._raise_error()
+        if not self._thread.is_alive():
+            raise ValueError("OutputWriter is closed")
+        snapshot = MazeGrid(maze.height, maze.width)
+        snapshot.cells[:] = maze.cells
+        self._jobs.put((snapshot, list(path)))
+
+    def wait(self) -> None:
+        """Block until every queued file is on disk"""
+        self._jobs.join()
+        self._raise_error()
+
+    def close(self) -> None:
+        """Write the queued files then stop the thread"""
+        if self._thread.is_alive():
+            self._jobs.put(None)
+            self._thread.join()
+        self._raise_error()
+
+
+if __name__ == "__main__":
+    exit()
@@ -1,25 +1,372 @@
-# This script does not check for errors or malformed files.
-# It only validates that neighbooring cells sharing a wall have
-#  both the correct encoding.
+# Validates a maze output file, streaming it by blocks of rows:
+#  - every line of the maze is made of hex digits and has the same size
+#  - neighbooring cells sharing a wall have both the correct encoding
+#  - the ENTRY / EXIT lines are "row,col" cells inside the maze
+#  - the path line walks from entry to exit through open walls only
+# Only two blocks of rows are in memory at a time, the wall checks are
+# NumPy shifts and masks over a whole block. Without NumPy the same
+# checks run row by row in pure Python (slower, same messages).
 # Usage: python3 output_validator.py output_maze.txt
 
 import sys
+import time
 
-if len(sys.argv) != 2:
-    print(f"Usage: python3 {sys.argv[0]} <output_file>")
-    sys.exit(1)
-
-g = []
-for line in open(sys.argv[1]):
-    if line.strip() == '':
-        break
-    g.append([int(c, 16) for c in line.strip(' \t\n\r')])
-
-for r in range(len(g)):
-    for c in range(len(g[0])):
-        v = g[r][c]
-        if not all([(r < 1 or v & 1 == (g[r-1][c] >> 2) & 1),
-                    (c >= len(g[0])-1 or (v >> 1) & 1 == (g[r][c+1] >> 3) & 1),
-                    (r >= len(g)-1 or (v >> 2) & 1 == g[r+1][c] & 1),
-                    (c < 1 or (v >> 3) & 1 == (g[r][c-1] >> 1) & 1)]):
-            print(f'Wrong encoding for ({c},{r})')
+try:
+    import numpy as np
+except ImportError:  # the pure Python checks are used instead
+    np = None
+
+# bytes read per block of rows
+BLOCK_BYTES = 1 << 24
+# errors printed per kind before only counting them
+MAX_REPORTED = 20
+
+# ascii byte -> hex value, 255 for anything else
+HEX_TABLE = bytearray(b"\xff" * 256)
+for i, digit in enumerate(b"0123456789abcdef"):
+    HEX_TABLE[digit] = i
+    HEX_TABLE[ord(chr(digit).upper())] = i
+HEX_TABLE = bytes(HEX_TABLE)
+
+# path move -> (wall bit, row step, col step)
+MOVES = {
+    ord("N"): (1, -1, 0),
+    ord("E"): (2, 0, 1),
+    ord("S"): (4, 1, 0),
+    ord("W"): (8, 0, -1),
+}
+
+if np is not None:
+    HEX_VALUES = np.frombuffer(HEX_TABLE, dtype=np.uint8)
+    MOVE_BIT = np.zeros(256, dtype=np.uint8)
+    MOVE_DR = np.zeros(256, dtype=np.int64)
+    MOVE_DC = np.zeros(256, dtype=np.int64)
+    for move, (bit, dr, dc) in MOVES.items():
+        MOVE_BIT[move] = bit
+        MOVE_DR[move] = dr
+        MOVE_DC[move] = dc
+
+
+class Report:
+    """Prints the errors, the first MAX_REPORTED of each kind"""
+
+    def __init__(self):
+        self.counts = {}
+
+    def error(self, kind, message):
+        count = self.counts.get(kind, 0) + 1
+        self.counts[kind] = count
+        if count <= MAX_REPORTED:
+            print(message)
+
+    def cells(self, kind, template, rows, cols):
+        if np is not None:
+            rows, cols = rows.tolist(), cols.tolist()
+        for r, c in zip(rows, cols):
+            self.error(kind, template.format(r=r, c=c))
+
+    def total(self):
+        for kind, count in self.counts.items():
+            if count > MAX_REPORTED:
+                print(f"... {count - MAX_REPORTED} more '{kind}' errors")
+        return sum(self.counts.values())
+
+
+def read_tail(f):
+    """
+    Offset where the maze lines end and the lines after the empty line
+    closing them (entry, exit, path), read backwards from the end
+    """
+    f.seek(0, 2)
+    pos = f.tell()
+    tail = b""
+    while pos:
+        step = min(pos, BLOCK_BYTES)
+        pos -= step
+        f.seek(pos)
+        tail = f.read(step) + tail
+        # the maze has no empty line: the last one closes it
+        body = tail.rstrip(b"\r\n")
+        sep = max(body.rfind(b"\n\n"), body.rfind(b"\n\r\n"))
+        if sep >= 0:
+            lines = body[sep:].strip(b"\r\n").split(b"\n")
+            return pos + sep + 1, [line.strip() for line in lines]
+    return None, []
+
+
+def parse_cell(line, name, height, width, report):
+    try:
+        r, c = (int(v) for v in line.decode().split(","))
+    except ValueError:
+        report.error(name, f"Wrong {name} line: {line!r}")
+        return None
+    if not (0 <= r < height and 0 <= c < width):
+        report.error(name, f"{name} ({r},{c}) is out of the maze")
+        return None
+    return r, c
+
+
+def walk_path(moves, entry, height, width, report):
+    """
+    Cells of the path and the wall each of them must have open, sorted
+    by row (all at once: cumulative sums of the moves)
+    """
+    codes = np.frombuffer(moves, dtype=np.uint8)
+    bad = np.flatnonzero(MOVE_BIT[codes] == 0)
+    if bad.size:
+        report.error("path", f"Wrong move {chr(codes[bad[0]])!r} in path")
+        return None
+    rows = np.empty(codes.size + 1, dtype=np.int64)
+    cols = np.empty(codes.size + 1, dtype=np.int64)
+    rows[0], cols[0] = entry
+    np.cumsum(MOVE_DR[codes], out=rows[1:])
+    np.cumsum(MOVE_DC[codes], out=cols[1:])
+    rows[1:] += entry[0]
+    cols[1:] += entry[1]
+    out = (rows < 0) | (rows >= height) | (cols < 0) | (cols >= width)
+    if out.any():
+        step = int(np.flatnonzero(out)[0])
+        report.error("path", f"Path leaves the maze at move {step}")
+        return None
+
+    # move i leaves cell i through the wall of its bit
+    order = np.argsort(rows[:-1], kind="stable")
+    return rows[:-1][order], cols[:-1][order], MOVE_BIT[codes][order], (
+        int(rows[-1]),
+        int(cols[-1]),
+    )
+
+
+def check_block(g, prev, prev_bad):
+    """
+    Cells disagreeing with a neighbour on a shared wall, for the last
+    row of the previous block (prev, with its errors so far prev_bad)
+    followed by block g
+    """
+    if prev is not None:
+        g = np.vstack((prev, g))
+    bad = np.zeros(g.shape, dtype=bool)
+    # east wall of a cell <-> west wall of the next one
+    diff = ((g[:, :-1] >> 1) & 1) != ((g[:, 1:] >> 3) & 1)
+    bad[:, :-1] |= diff
+    bad[:, 1:] |= diff
+    # south wall of a cell <-> north wall of the one below
+    diff = ((g[:-1] >> 2) & 1) != (g[1:] & 1)
+    bad[:-1] |= diff
+    bad[1:] |= diff
+    if prev is not None:
+        bad[0] |= prev_bad
+    return bad
+
+
+def read_blocks(f, maze_end):
+    """Yield the maze lines by blocks of about BLOCK_BYTES"""
+    left = maze_end - f.tell()
+    while left > 0:
+        lines = f.readlines(min(BLOCK_BYTES, left))
+        if not lines:
+            return
+        size = sum(map(len, lines))
+        # readlines may go past the hint: drop what is after the maze
+        while size > left:
+            size -= len(lines.pop())
+        left -= size
+        yield [line.rstrip(b"\r\n") for line in lines]
+
+
+def walk_path_py(moves, entry, height, width, report):
+    """
+    walk_path without NumPy: {row: [(col, wall bit)]} of the cells of the
+    path and the wall each of them must have open, and the last cell
+    """
+    walls = {}
+    r, c = entry
+    for step, move in enumerate(moves):
+        if move not in MOVES:
+            report.error("path", f"Wrong move {chr(move)!r} in path")
+            return None
+        bit, dr, dc = MOVES[move]
+        walls.setdefault(r, []).append((c, bit))
+        r, c = r + dr, c + dc
+        if not (0 <= r < height and 0 <= c < width):
+            report.error("path", f"Path leaves the maze at move {step + 1}")
+            return None
+    return walls, (r, c)
+
+
+def check_rows_py(f, maze_end, width, path, report):
+    """
+    The block checks without NumPy, one row at a time.
+    Returns the number of rows read, None when a line has a wrong size
+    """
+    r = 0
+    prev = None
+    prev_bad = None
+    for lines in read_blocks(f, maze_end):
+        for line in lines:
+            if len(line) != width:
+                report.error(
+                    "size", f"Line {r} has {len(line)} cells, not {width}"
+                )
+                return None
+            g = line.translate(HEX_TABLE)
+            for c in range(width):
+                if g[c] == 255:
+                    report.error(
+                        "digit", f"Not a hex digit at row {r}, col {c}"
+                    )
+
+            bad = [False] * width
+            # east wall of a cell <-> west wall of the next one
+            for c in range(width - 1):
+                if (g[c] >> 1) & 1 != (g[c + 1] >> 3) & 1:
+                    bad[c] = bad[c + 1] = True
+            if prev is not None:
+                # south wall of a cell <-> north wall of the one below
+                for c in range(width):
+                    if (prev[c] >> 2) & 1 != g[c] & 1:
+                        prev_bad[c] = bad[c] = True
+                report.cells(
+                    "encoding",
+                    "Wrong encoding for ({c},{r})",
+                    [r - 1] * width,
+                    [c for c in range(width) if prev_bad[c]],
+                )
+
+            if path is not None:
+                for c, bit in path[0].get(r, ()):
+                    if not g[c] & bit:
+                        report.error(
+                            "path",
+                            f"Path goes through a wall at row {r}, col {c}",
+                        )
+            prev, prev_bad = g, bad
+            r += 1
+
+    if prev_bad is not None:
+        report.cells(
+            "encoding",
+            "Wrong encoding for ({c},{r})",
+            [r - 1] * width,
+            [c for c in range(width) if prev_bad[c]],
+        )
+    return r
+
+
+def validate(file_name):
+    report = Report()
+    start = time.perf_counter()
+    with open(file_name, "rb", buffering=BLOCK_BYTES) as f:
+        maze_end, tail = read_tail(f)
+        if maze_end is None or len(tail) < 2:
+            print("Missing empty line, entry and exit after the maze")
+            return 1
+        f.seek(0)
+        first = f.readline()
+        width = len(first.rstrip(b"\r\n"))
+        if not width:
+            print("Empty maze")
+            return 1
+        # exact when every line has the size of the first one (checked)
+        height = maze_end // len(first)
+
+        entry = parse_cell(tail[0], "entry", height, width, report)
+        exit_ = parse_cell(tail[1], "exit", height, width, report)
+        if entry is not None and entry == exit_:
+            report.error("entry", "Entry and exit are the same cell")
+        moves = tail[2].strip() if len(tail) > 2 else b""
+        path = None
+        if entry is not None and exit_ is not None:
+            if not moves:
+                report.error("path", "Missing path line")
+            elif np is None:
+                path = walk_path_py(moves, entry, height, width, report)
+            else:
+                path = walk_path(moves, entry, height, width, report)
+        if path is not None and path[-1] != exit_:
+            report.error(
+                "path",
+                f"Path ends at row {path[-1][0]}, col {path[-1][1]} "
+                "instead of the exit",
+            )
+
+        f.seek(0)
+        if np is None:
+            r0 = check_rows_py(f, maze_end, width, path, report)
+            if r0 is None:
+                print(f"{report.total()} errors")
+                return 1
+            return finish(report, start, height, width, r0)
+        r0 = 0
+        prev = None
+        prev_bad = None
+        for lines in read_blocks(f, maze_end):
+            sizes = np.fromiter(map(len, lines), dtype=np.int64)
+            wrong = np.flatnonzero(sizes != width)
+            for i in wrong.tolist():
+                report.error(
+                    "size", f"Line {r0 + i} has {sizes[i]} cells, not {width}"
+                )
+            if wrong.size:
+                print(f"{report.total()} errors")
+                return 1
+            raw = np.frombuffer(b"".join(lines), dtype=np.uint8)
+            g = HEX_VALUES[raw].reshape(len(lines), width)
+            rows, cols = np.nonzero(g == 255)
+            report.cells(
+                "digit", "Not a hex digit at row {r}, col {c}", rows + r0, cols
+            )
+
+            # the last row waits for the next block to be complete
+            bad = check_block(g, prev, prev_bad)
+            first = r0 - (prev is not None)
+            rows, cols = np.nonzero(bad[:-1])
+            report.cells(
+                "encoding", "Wrong encoding for ({c},{r})", rows + first, cols
+            )
+            prev_bad = bad[-1]
+
+            if path is not None:
+                p_rows, p_cols, p_bits, _ = path
+                lo, hi = np.searchsorted(p_rows, (r0, r0 + len(lines)))
+                values = g[p_rows[lo:hi] - r0, p_cols[lo:hi]]
+                closed = np.flatnonzero((values & p_bits[lo:hi]) == 0)
+                report.cells(
+                    "path",
+                    "Path goes through a wall at row {r}, col {c}",
+                    p_rows[lo:hi][closed],
+                    p_cols[lo:hi][closed],
+                )
+
+            prev = g[-1:]
+            r0 += len(lines)
+
+        if prev_bad is not None:
+            cols = np.flatnonzero(prev_bad)
+            report.cells(
+                "encoding",
+                "Wrong encoding for ({c},{r})",
+                np.full(cols.size, r0 - 1),
+                cols,
+            )
+    return finish(report, start, height, width, r0)
+
+
+def finish(report, start, height, width, rows):
+    """Last checks and the summary lines, returns the exit code"""
+    if rows != height:
+        report.error("size", f"Expected {height} lines, found {rows}")
+    elapsed = time.perf_counter() - start
+    cells = height * width
+    rate = cells / elapsed if elapsed > 0 else float("inf")
+    print(f"{cells} cells in {elapsed:.3f}s ({rate:,.0f} cells/s)")
+    errors = report.total()
+    print("OK" if not errors else f"{errors} errors")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(f"Usage: python3 {sys.argv[0]} <output_file>")
+        sys.exit(1)
+    sys.exit(validate(sys.argv[1]))
@@ -0,0 +1,47 @@
+"""
+Docstring for tests.conftest
+
+Shared helpers of the test suite: run from the repository root with
+`make test` (or `python3 -m pytest tests`).
+"""
+
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mazegen import MazeManager  # noqa: E402
+
+
+def maze_config(height, width, out, **overrides):
+    """A MazeManager config, entry top-left and exit bottom-right"""
+    config = {
+        "HEIGHT": height,
+        "WIDTH": width,
+        "ENTRY": (0, 0),
+        "EXIT": (height - 1, width - 1),
+        "OUTPUT_FILE": out,
+        "PERFECT": True,
+        "SEED": 42,
+        "COLOR": "Default",
+    }
+    config.update(overrides)
+    return config
+
+
+@pytest.fixture
+def make_manager(tmp_path):
+    """Factory of MazeManager writing into tmp_path"""
+
+    def make(height, width, **overrides):
+        out = str(tmp_path / "maze.txt")
+        # silence the "42 pattern omitted" notice of the small sizes
+        with contextlib.redirect_stdout(io.StringIO()):
+            return MazeManager(maze_config(height, width, out, **overrides))
+
+    return make
@@ -0,0 +1,39 @@
+import os
+import tarfile
+
+from mazegen import run_batch
+from mazegen.batch import seed_file
+
+from conftest import maze_config
+
+
+def read_files(report):
+    contents = {}
+    for result in report.results:
+        with open(result.file, "rb") as f:
+            contents[result.seed] = f.read()
+    return contents
+
+
+def test_same_files_for_any_worker_count(tmp_path):
+    outputs = []
+    for workers, chunk in ((1, 1), (2, 3), (3, 2)):
+        folder = tmp_path / f"w{workers}"
+        folder.mkdir()
+        config = maze_config(9, 12, str(folder / "maze.txt"), PERFECT=False)
+        report = run_batch(config, range(10, 20), workers, chunk)
+        assert [r.seed for r in report.results] == list(range(10, 20))
+        outputs.append(read_files(report))
+    assert outputs[0] == outputs[1] == outputs[2]
+
+
+def test_archive_holds_the_same_mazes(tmp_path):
+    config = maze_config(9, 12, str(tmp_path / "maze.txt"))
+    files = read_files(run_batch(config, range(5), 2))
+
+    archive = str(tmp_path / "mazes.tar")
+    run_batch(config, range(5), 2, archive=archive)
+    with tarfile.open(archive) as tar:
+        for seed in range(5):
+            name = os.path.basename(seed_file(config["OUTPUT_FILE"], seed))
+            assert tar.extractfile(name).read() == files[seed]
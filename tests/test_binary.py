@@ -0,0 +1,41 @@
+import pytest
+
+from mazegen import BFS, load_binary, save_binary
+from mazegen.binary import PACK_BYTE, PACK_NIBBLE
+
+
+@pytest.mark.parametrize("packing", [PACK_NIBBLE, PACK_BYTE])
+@pytest.mark.parametrize("height, width", [(20, 25), (7, 9), (1, 1)])
+def test_round_trip(make_manager, tmp_path, packing, height, width):
+    mm = make_manager(height, width, PERFECT=False)
+    mm.generate()
+    path = BFS().shortest_path(mm.maze, height, width, mm.entry, mm.exit)
+    file = str(tmp_path / "maze.bin")
+    save_binary(
+        file, mm.maze, mm.entry, mm.exit, path, 42, "dfs", packing=packing
+    )
+
+    with load_binary(file) as binary:
+        assert (binary.height, binary.width) == (height, width)
+        assert (binary.entry, binary.exit) == (mm.entry, mm.exit)
+        assert binary.seed == 42
+        assert binary.generator == "dfs"
+        assert bytes(binary.maze.cells) == bytes(mm.maze.cells)
+        assert binary.path == path
+
+
+def test_no_path_no_seed(make_manager, tmp_path):
+    mm = make_manager(5, 6)
+    mm.generate()
+    file = str(tmp_path / "maze.bin")
+    save_binary(file, mm.maze, mm.entry, mm.exit)
+    with load_binary(file) as binary:
+        assert binary.path is None
+        assert binary.seed is None
+
+
+def test_not_a_maze_file(tmp_path):
+    file = tmp_path / "maze.bin"
+    file.write_bytes(b"not a binary maze file at all, just text" * 4)
+    with pytest.raises(ValueError):
+        load_binary(str(file))
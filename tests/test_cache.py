@@ -0,0 +1,83 @@
+import os
+import random
+
+import pytest
+
+from mazegen import MazeCache
+
+from conftest import maze_config
+
+
+def store_one(cache, make_manager, tmp_path, **overrides):
+    config = maze_config(8, 10, str(tmp_path / "maze.txt"), **overrides)
+    mm = make_manager(8, 10, **overrides)
+    mm.generate()
+    path = [(0, 0), (0, 1)]
+    cache.store(config, mm.maze, path, mm.rng.getstate())
+    return config, mm, path
+
+
+def test_round_trip(make_manager, tmp_path):
+    cache = MazeCache(str(tmp_path / "cache"), 1 << 20)
+    config, mm, path = store_one(cache, make_manager, tmp_path)
+    entry = cache.load(config)
+    assert bytes(entry.grid.cells) == bytes(mm.maze.cells)
+    assert entry.path == path
+    # the rng resumes where the generation left it
+    resumed = random.Random()
+    resumed.setstate(entry.rng_state)
+    assert resumed.random() == mm.rng.random()
+
+
+def test_key_changes_with_the_maze_config(tmp_path):
+    config = maze_config(8, 10, "a.txt")
+    assert MazeCache.key(config) == MazeCache.key({**config, "COLOR": "Red"})
+    assert MazeCache.key(config) == MazeCache.key(
+        {**config, "OUTPUT_FILE": "b.txt"}
+    )
+    assert MazeCache.key(config) != MazeCache.key({**config, "SEED": 43})
+    assert MazeCache.key(config) != MazeCache.key(
+        {**config, "LOOP_DENSITY": 0.5}
+    )
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        b'{"height": 8}\n' + bytes(80),
+        b"[1, 2]\n" + bytes(80),
+        b'"text"\n',
+        # an RNG state the generator can not resume from
+        b'{"height": 8, "width": 10, "path": null, '
+        b'"rng_state": [3, [1], null]}\n' + bytes(80),
+        b"\xff\xfe\n",
+        b"",
+    ],
+    ids=["no-key", "not-object", "no-cells", "bad-rng", "binary", "empty"],
+)
+def test_damaged_entry_is_a_removed_miss(make_manager, tmp_path, content):
+    cache = MazeCache(str(tmp_path / "cache"), 1 << 20)
+    config, _, _ = store_one(cache, make_manager, tmp_path)
+    file = os.path.join(cache.directory, MazeCache.key(config) + ".maze")
+    with open(file, "wb") as f:
+        f.write(content)
+    assert cache.load(config) is None
+    assert not os.path.exists(file)
+
+
+def test_evicts_least_recently_used(make_manager, tmp_path):
+    cache = MazeCache(str(tmp_path / "cache"), 1 << 20)
+    configs = [
+        store_one(cache, make_manager, tmp_path, SEED=seed)[0]
+        for seed in range(3)
+    ]
+    files = [
+        os.path.join(cache.directory, MazeCache.key(c) + ".maze")
+        for c in configs
+    ]
+    for age, file in enumerate(files):
+        os.utime(file, (1000 + age, 1000 + age))
+    # room for two entries: the oldest one goes
+    cache.max_bytes = os.path.getsize(files[1]) + os.path.getsize(files[2])
+    cache.evict()
+    assert [os.path.exists(file) for file in files] == [False, True, True]
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from mazegen import GENERATORS, STEPPERS, find_open_areas
+from mazegen.eller import EllerGenerator
+from mazegen.models import EAST, NORTH, PATTERN, SOUTH, WEST, MazeGrid
+
+ENGINES = [name for name in GENERATORS if name != "tiled"]
+
+
+def replay(mm, events):
+    """The grid rebuilt from the (cell, side) events of iter_generate"""
+    grid = MazeGrid(mm.height, mm.width)
+    cells = grid.cells
+    # side -> (opposite side, offset of the neighbor)
+    neighbor = {
+        NORTH: (SOUTH, -mm.width),
+        SOUTH: (NORTH, mm.width),
+        EAST: (WEST, 1),
+        WEST: (EAST, -1),
+    }
+    for cell, side in events:
+        back, offset = neighbor[abs(side)]
+        if side > 0:
+            cells[cell] |= side
+            cells[cell + offset] |= back
+        else:
+            # a wall closed again (3x3 open areas)
+            cells[cell] &= ~-side
+            cells[cell + offset] &= ~back
+    return grid
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("perfect", [True, False])
+def test_iter_generate_gives_the_generate_maze(make_manager, engine, perfect):
+    expected = make_manager(14, 19, ALGORITHM=engine, PERFECT=perfect)
+    expected.generate()
+    mm = make_manager(14, 19, ALGORITHM=engine, PERFECT=perfect)
+    events = list(mm.iter_generate())
+    assert bytes(mm.maze.cells) == bytes(expected.maze.cells)
+    walls = bytes(m & ~PATTERN for m in mm.maze.cells)
+    assert bytes(m & ~PATTERN for m in replay(mm, events).cells) == walls
+
+
+def test_dfs_has_a_stepper():
+    assert "dfs" in STEPPERS
+
+
+def eller_grid(height, width, seed, perfect, density=0.35):
+    grid = MazeGrid(height, width)
+    eller = EllerGenerator(
+        height, width, random.Random(seed), perfect, density
+    )
+    for r, row in enumerate(eller.rows()):
+        grid.cells[r * width:(r + 1) * width] = row
+    return grid
+
+
+def loops(grid):
+    """Open walls beyond a spanning tree of the free cells"""
+    cells = grid.cells
+    free = sum(1 for m in cells if not m & PATTERN)
+    walls = sum(bin(m & (EAST | SOUTH)).count("1") for m in cells)
+    return walls - (free - 1)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_streamed_eller_loop_density(seed):
+    assert loops(eller_grid(40, 50, seed, True)) == 0
+    assert loops(eller_grid(40, 50, seed, False, 0.0)) == 0
+    sparse = loops(eller_grid(40, 50, seed, False, 0.1))
+    dense = loops(eller_grid(40, 50, seed, False, 0.5))
+    assert 0 < sparse < dense
+    for density in (0.35, 1.0):
+        assert not find_open_areas(eller_grid(40, 50, seed, False, density))
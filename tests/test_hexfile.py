@@ -0,0 +1,38 @@
+from mazegen import BFS, solve_file
+
+
+def write_maze(make_manager, with_path):
+    """OUTPUT_FILE of a new maze, with or without its path line"""
+    mm = make_manager(8, 10)
+    mm.generate()
+    path = BFS().shortest_path(mm.maze, 8, 10, mm.entry, mm.exit)
+    mm.save_maze_file(path if with_path else None, background=False)
+    return mm.o_file, len(path) - 1
+
+
+def test_check_reports_a_missing_path(make_manager):
+    file, length = write_maze(make_manager, False)
+    with open(file, "rb") as f:
+        before = f.read()
+
+    result = solve_file(file, write=False)
+    assert (result.status, result.length) == ("missing", length)
+    with open(file, "rb") as f:
+        assert f.read() == before
+
+
+def test_missing_path_is_appended_then_valid(make_manager):
+    file, length = write_maze(make_manager, False)
+    assert solve_file(file).status == "appended"
+    result = solve_file(file, write=False)
+    assert (result.status, result.length) == ("valid", length)
+
+
+def test_wrong_path_is_invalid(make_manager):
+    file, _ = write_maze(make_manager, True)
+    with open(file, "rb") as f:
+        data = f.read()
+    # one more step at the end: too long, and it leaves the exit
+    with open(file, "wb") as f:
+        f.write(data.rstrip(b"\n") + b"N\n")
+    assert solve_file(file, write=False).status == "invalid"
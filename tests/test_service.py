@@ -0,0 +1,110 @@
+import asyncio
+import json
+from http import HTTPStatus
+
+import pytest
+
+from mazegen import MazeService
+from mazegen.service import HTTPError
+
+GENERATE = {
+    "WIDTH": 12,
+    "HEIGHT": 8,
+    "SEED": 3,
+    "PERFECT": True,
+    "ENTRY": [0, 0],
+    "EXIT": [7, 11],
+}
+
+
+def route(service, method, target, body=b""):
+    """Status of one request routed without any server or worker"""
+
+    async def run():
+        try:
+            status, _, _ = await service._route(method, target, body)
+        except HTTPError as e:
+            return e.status
+        return status
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize(
+    "target, body",
+    [
+        ("/generate", b"not json"),
+        ("/generate", b"[1, 2]"),
+        ("/generate", json.dumps({"WIDTH": 3}).encode()),
+        ("/generate", json.dumps({**GENERATE, "EXIT": [8, 11]}).encode()),
+        ("/generate", json.dumps({**GENERATE, "COLOR": "Red"}).encode()),
+        ("/solve", json.dumps({"grid": [], "ENTRY": [0, 0]}).encode()),
+    ],
+)
+def test_bad_requests(target, body):
+    assert route(MazeService(1), "POST", target, body) == 400
+
+
+def test_unknown_endpoint_and_method():
+    service = MazeService(1)
+    assert route(service, "GET", "/nope") == HTTPStatus.NOT_FOUND
+    assert route(service, "GET", "/generate") == 405
+
+
+def test_full_queue_is_refused():
+    service = MazeService(1, queue_size=1)
+    body = json.dumps({**GENERATE, "SEED": None}).encode()
+
+    async def run():
+        # no dispatcher: the queued job stays in the queue
+        service.queue.put_nowait(None)
+        with pytest.raises(HTTPError) as error:
+            await service._route("POST", "/generate", body)
+        return error.value.status
+
+    assert asyncio.run(run()) == HTTPStatus.SERVICE_UNAVAILABLE
+    assert service.metrics.rejected == 1
+
+
+async def request(socket, method, target, body=b""):
+    """Status, headers and body of one HTTP request over a Unix socket"""
+    reader, writer = await asyncio.open_unix_connection(socket)
+    writer.write(
+        f"{method} {target} HTTP/1.1\r\nHost: test\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+        + body
+    )
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    head, _, answer = data.partition(b"\r\n\r\n")
+    lines = head.decode().split("\r\n")
+    headers = dict(line.split(": ", 1) for line in lines[1:])
+    return int(lines[0].split()[1]), headers, answer
+
+
+def test_generate_over_http(tmp_path):
+    socket = str(tmp_path / "maze.sock")
+    body = json.dumps(GENERATE).encode()
+
+    async def run():
+        service = MazeService(1)
+        await service.start(unix=socket)
+        try:
+            health = await request(socket, "GET", "/health")
+            first = await request(socket, "POST", "/generate", body)
+            second = await request(socket, "POST", "/generate", body)
+            bad = await request(socket, "POST", "/generate", b"{")
+        finally:
+            await service.close()
+        return health, first, second, bad
+
+    health, first, second, bad = asyncio.run(run())
+    assert health[0] == 200
+    assert (first[0], first[1]["X-Cache"]) == (200, "miss")
+    assert (second[0], second[1]["X-Cache"]) == (200, "hit")
+    assert first[2] == second[2]
+    maze = json.loads(first[2])
+    assert len(maze["grid"]) == 8 and len(maze["grid"][0]) == 12
+    assert maze["path_length"] == len(maze["path"])
+    assert bad[0] == 400
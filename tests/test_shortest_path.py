@@ -0,0 +1,97 @@
+import pytest
+
+from mazegen import (
+    BFS,
+    SOLVERS,
+    DistanceField,
+    Solver,
+    TreePathIndex,
+    load_binary,
+    save_binary,
+)
+from mazegen.binary import PACK_BYTE
+from mazegen.models import EAST, NORTH, SOUTH, WEST, MazeGrid
+
+
+def corridor(height, width):
+    """A single straight corridor, one row or one column"""
+    grid = MazeGrid(height, width)
+    n = height * width
+    for i in range(n):
+        if width == 1:
+            grid.cells[i] |= (NORTH if i else 0) | (SOUTH if i < n - 1 else 0)
+        else:
+            grid.cells[i] |= (WEST if i else 0) | (EAST if i < n - 1 else 0)
+    return grid
+
+
+@pytest.mark.parametrize("height, width", [(5, 1), (1, 5), (1, 1)])
+def test_distance_field_on_corridors(height, width):
+    grid = corridor(height, width)
+    target = (height - 1, width - 1)
+    field = DistanceField(grid, height, width, target)
+    path = BFS().shortest_path(grid, height, width, (0, 0), target)
+    assert path is not None
+    assert field.route((0, 0)) == path
+    assert field.distance((0, 0)) == len(path) - 1
+
+
+@pytest.mark.parametrize(
+    "height, width, perfect",
+    [(9, 1, True), (1, 9, False), (12, 17, False), (20, 20, True)],
+)
+def test_distance_field_matches_bfs(make_manager, height, width, perfect):
+    mm = make_manager(height, width, PERFECT=perfect)
+    mm.generate()
+    field = DistanceField(mm.maze, height, width, mm.exit)
+    for r in range(height):
+        for c in range(width):
+            path = BFS().shortest_path(mm.maze, height, width, (r, c), mm.exit)
+            if path is None:
+                assert field.distance((r, c)) is None
+            else:
+                assert field.distance((r, c)) == len(path) - 1
+                assert len(field.route((r, c))) == len(path)
+
+
+@pytest.mark.parametrize("perfect", [True, False])
+def test_solvers_on_memory_mapped_grid(make_manager, tmp_path, perfect):
+    mm = make_manager(20, 25, PERFECT=perfect)
+    mm.generate()
+    expected = BFS().shortest_path(mm.maze, 20, 25, mm.entry, mm.exit)
+    file = str(tmp_path / "maze.bin")
+    save_binary(file, mm.maze, mm.entry, mm.exit, packing=PACK_BYTE)
+
+    with load_binary(file) as binary:
+        # PACK_BYTE cells are a view of the mapping, not a bytearray
+        assert isinstance(binary.maze.cells, memoryview)
+        for name, solver in SOLVERS.items():
+            path = solver().shortest_path(
+                binary.maze, 20, 25, binary.entry, binary.exit
+            )
+            assert len(path) == len(expected), name
+        index = TreePathIndex(binary.maze, 20, 25)
+        assert index.is_tree == perfect
+        assert index.path_length(binary.entry, binary.exit) == (
+            len(expected) - 1
+        )
+        assert len(index.path(binary.entry, binary.exit)) == len(expected)
+
+
+def test_tree_path_index_matches_bfs(make_manager):
+    mm = make_manager(15, 18)
+    mm.generate()
+    index = TreePathIndex(mm.maze, 15, 18)
+    assert index.is_tree
+    for start in [(0, 0), (7, 3), (14, 0), (3, 17)]:
+        path = BFS().shortest_path(mm.maze, 15, 18, start, mm.exit)
+        assert index.path_length(start, mm.exit) == len(path) - 1
+        assert index.path(start, mm.exit) == path
+
+
+def test_solver_without_search_is_refused():
+    class Incomplete(Solver):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from mazegen import TiledGenerator
+from mazegen.models import (
+    EAST,
+    NORTH,
+    PATTERN,
+    SOUTH,
+    WEST,
+    MazeGrid,
+    forty_two_coords,
+)
+
+
+def pattern_grid(height, width):
+    return MazeGrid(height, width, forty_two_coords(height, width))
+
+
+def carve(height, width, tile_size, workers, seed=7):
+    grid = pattern_grid(height, width)
+    TiledGenerator(tile_size, workers)(grid, random.Random(seed))
+    return grid
+
+
+def assert_perfect(grid):
+    """Consistent walls, 42 closed, and a spanning tree of free cells"""
+    cells, w = grid.cells, grid.width
+    n = len(cells)
+    free = [i for i in range(n) if not cells[i] & PATTERN]
+    edges = 0
+    for i in range(n):
+        mask = cells[i]
+        if mask & PATTERN:
+            assert mask == PATTERN
+            continue
+        if mask & EAST:
+            assert i % w < w - 1 and cells[i + 1] & WEST
+            edges += 1
+        if mask & SOUTH:
+            assert i + w < n and cells[i + w] & NORTH
+            edges += 1
+        if mask & WEST:
+            assert i % w > 0 and cells[i - 1] & EAST
+        if mask & NORTH:
+            assert i >= w and cells[i - w] & SOUTH
+    assert edges == len(free) - 1
+
+    seen = {free[0]}
+    stack = [free[0]]
+    while stack:
+        cur = stack.pop()
+        for side, step in ((NORTH, -w), (SOUTH, w), (EAST, 1), (WEST, -1)):
+            if cells[cur] & side and cur + step not in seen:
+                seen.add(cur + step)
+                stack.append(cur + step)
+    assert len(seen) == len(free)
+
+
+@pytest.mark.parametrize(
+    "height, width, tile_size", [(30, 40, 8), (25, 31, 7), (20, 20, 50)]
+)
+def test_perfect_and_connected(height, width, tile_size):
+    assert_perfect(carve(height, width, tile_size, 1))
+
+
+def test_same_maze_for_any_worker_count():
+    mazes = [bytes(carve(33, 45, 8, workers).cells) for workers in (1, 2, 3)]
+    assert mazes[0] == mazes[1] == mazes[2]
+
+
+def test_seed_and_tile_size_change_the_maze():
+    base = bytes(carve(30, 40, 8, 1).cells)
+    assert bytes(carve(30, 40, 8, 1, seed=8).cells) != base
+    assert bytes(carve(30, 40, 10, 1).cells) != base
+
+
+@pytest.mark.parametrize("engine", ["tiled", "eller", "nope"])
+def test_rejected_engines(engine):
+    with pytest.raises(ValueError):
+        TiledGenerator(8, 1, engine)